@@ -1,22 +1,35 @@
 import os
 import sys
-import sounddevice as sd
 import numpy as np
 import time
 import re
-import torch
 import threading
 import random
 import io
 
-from funasr import AutoModel
+# sounddevice / torch / funasr / modelscope / scipy 在节点第一次执行时才导入，见 lazy_import
 # from funasr.utils.postprocess_utils import rich_transcription_postprocess
-from modelscope import snapshot_download
-from scipy.io.wavfile import write
 from datetime import datetime
 
+_import_start = time.perf_counter()
+
+from .utils.lazy_import import format_import_report, lazy_import
+from .utils.model_registry import model_registry
+from .utils.model_manifest import model_revision, resolve_model_dir
+from .utils.audio_utils import audio_duration, audio_to_waveform, is_audio_item, plan_batches
+from .utils.device_utils import configure_cpu_threads, resolve_device
+from .utils.result_cache import TranscriptionCache
+from .utils.transcribe_queue import transcribe_queue
+from .utils.stage_timer import StageTimer, node_stats, stage_stats
+
 now_dir = os.path.dirname(os.path.abspath(__file__))
 
+# 识别结果缓存：相同音频内容+相同解码参数直接返回上次的文本
+result_cache = TranscriptionCache(
+    cache_dir=os.environ.get("SENSEVOICE_CACHE_DIR", os.path.join(now_dir, ".cache", "transcripts")),
+    max_disk_bytes=int(os.environ.get("SENSEVOICE_CACHE_MB", 64)) << 20,
+)
+
 
 # 注册节点
 class VoiceRecorderNode:
@@ -40,6 +53,7 @@ class VoiceRecorderNode:
         # 音频流对象
         self.stream = None
         self.fs = 44100  # 固定采样率
+        self.save_file = True
 
     @classmethod
     def INPUT_TYPES(cls):
@@ -58,11 +72,17 @@ class VoiceRecorderNode:
                 "record_seconds": ("FLOAT", {"default": 5.0, "min": 1.0, "max": 360.0, "step": 1.0}),
                 "remove_file": ("BOOLEAN", {"default": False})
             },
+            "optional": {
+                # 关闭后只在内存中输出audio，不写wav文件（STT节点可直接使用audio输入）
+                "save_file": ("BOOLEAN", {"default": True}),
+            }
         }
 
-    def process_record(self, folder, random_seed, wait_for_seconds, sample_rate, record_seconds, remove_file):
+    def process_record(self, folder, random_seed, wait_for_seconds, sample_rate, record_seconds, remove_file,
+                       save_file=True):
         # 采样率
         self.fs = sample_rate
+        self.save_file = save_file
 
         try:
             # 创建保存目录
@@ -86,7 +106,7 @@ class VoiceRecorderNode:
                     "status": [self.audio_path],
                     "progress": [0.5]
                 },
-                "result": (self.audio_data, [self.audio_path])
+                "result": (self.audio_data, [self.audio_path] if self.audio_path else [])
             }
         except Exception as e:
             # return (None, f"错误: {str(e)}")
@@ -94,7 +114,7 @@ class VoiceRecorderNode:
         finally:
             self.audio_data_list = None
             self.audio_data = None
-            if remove_file:
+            if remove_file and self.audio_path:
                 print('准备删除音频文件')
                 timer = threading.Timer(15, self.remove_audio_file)
                 timer.start()
@@ -120,6 +140,7 @@ class VoiceRecorderNode:
             print("🎤 录音开始...")
 
             # 启动音频流
+            sd = lazy_import("sounddevice")
             self.stream = sd.InputStream(
                 samplerate=self.fs,
                 channels=1,
@@ -157,16 +178,19 @@ class VoiceRecorderNode:
             # print('开始保存音频数据...')
             full_recording = np.concatenate(self.audio_data_list, axis=0)
 
-            # 生成时间戳
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = os.path.join(
-                self.save_dir,
-                f"recording_{timestamp}.wav"
-            )
+            filename = ""
+            if self.save_file:
+                # 生成时间戳
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = os.path.join(
+                    self.save_dir,
+                    f"recording_{timestamp}.wav"
+                )
 
-            write(filename, self.fs, full_recording)
-            # print(f"💾 文件已保存到：{os.path.abspath(filename)}")
-            print("✅ 录音已保存")
+                write = lazy_import("scipy.io.wavfile", "write")
+                write(filename, self.fs, full_recording)
+                # print(f"💾 文件已保存到：{os.path.abspath(filename)}")
+                print("✅ 录音已保存")
 
             # 创建一个 BytesIO 缓冲区来保存 WAV 数据
             # wav_buffer = io.BytesIO()
@@ -178,11 +202,13 @@ class VoiceRecorderNode:
             # 假设 full_recording 是 int16 类型的 NumPy 数组，形状是 (T,) 或 (T, 1) 或 (T, 2)
             # fs = self.fs 一般是 44100 或 48000
 
-            # Step 1: 如果是整数 PCM 格式（如 int16），归一化到 [-1, 1]
+            # Step 1: 如果是整数 PCM 格式（如 int16），归一化到 [-1, 1]（只做一次转换，原地缩放）
             if full_recording.dtype == np.int16:
-                full_recording = full_recording.astype(np.float32) / 32768.0
+                full_recording = full_recording.astype(np.float32)
+                full_recording *= np.float32(1.0 / 32768.0)
             elif full_recording.dtype == np.int32:
-                full_recording = full_recording.astype(np.float32) / 2147483648.0
+                full_recording = full_recording.astype(np.float32)
+                full_recording *= np.float32(1.0 / 2147483648.0)
 
             # Step 2: 确保形状为 [1, T] 或 [1, 1, T]（batch=1, channel=1）
             if len(full_recording.shape) == 1:
@@ -193,8 +219,9 @@ class VoiceRecorderNode:
                     # 单声道或立体声 shape: (T, 1) or (T, 2)
                     full_recording = np.expand_dims(full_recording, axis=0)  # -> (1, T, 1/2)
 
-            # Step 3: 转换为 PyTorch 张量，并确保是 float32
-            waveform_tensor = torch.tensor(full_recording, dtype=torch.float32)
+            # Step 3: 转换为 PyTorch 张量（from_numpy 共享内存，不再复制）
+            torch = lazy_import("torch")
+            waveform_tensor = torch.from_numpy(np.ascontiguousarray(full_recording, dtype=np.float32))
 
             # 最终结果
             # output = {
@@ -209,10 +236,12 @@ class VoiceRecorderNode:
 
 
 class STTNode:
+    _import_reported = False
 
     def __init__(self):
-        self.model = None
         self.model_dir = None
+        self.model_key = None
+        self.dtype = "fp32"
         self.result_txt = None
 
     @classmethod
@@ -228,6 +257,25 @@ class STTNode:
                 "batch_size_s": ("INT", {"default": 60, "min": 1, "max": 100}),
                 "merge_vad": ("BOOLEAN", {"default": True}),
                 "merge_length_s": ("INT", {"default": 15, "min": 1, "max": 30})
+            },
+            "optional": {
+                # 直接使用录音节点的audio（内存中的波形），不再重新读取wav文件
+                "audio": ("AUDIO",),
+                # 多文件批量识别，可直接连接录音节点的file_path_list，也可以是AUDIO列表
+                "file_path_list": ("LIST",),
+                # 离线模式：只使用本地模型文件，不访问modelscope
+                "offline": ("BOOLEAN", {"default": False}),
+                "device": (["cuda:0", "cpu"], {"default": "cuda:0"}),
+                # cpu推理线程数，0表示使用当前进程可用的全部核心
+                "cpu_threads": ("INT", {"default": 0, "min": 0, "max": 256}),
+                "use_cache": ("BOOLEAN", {"default": True}),
+                # cpu上对线性层做int8动态量化，用少量精度换约2倍编码器速度（cuda设备忽略）
+                "quantize": ("BOOLEAN", {
+                    "default": False,
+                    "tooltip": "cpu上int8动态量化（cuda设备忽略）。装了torchao时使用torchao.quantize_；"
+                               "否则回退到已弃用、将被torch移除的torch.ao.quantization.quantize_dynamic，"
+                               "torch版本已移除时会报错提示安装torchao",
+                }),
             }
         }
 
@@ -237,53 +285,231 @@ class STTNode:
     CATEGORY = "STT/SenseVoice"
     OUTPUT_NODE = True
 
-    def generate(self, audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s):
+    def generate(self, audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s,
+                 audio=None, file_path_list=None, offline=False, device="cuda:0", cpu_threads=0,
+                 use_cache=True, quantize=False):
+        try:
+            self.result_txt, rtf = self.transcribe(
+                audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s,
+                audio, file_path_list, offline, device, cpu_threads, use_cache, quantize
+            )
+            return {
+                "ui": {
+                    "model_cache": [model_registry.stats()],
+                    "result_cache": [result_cache.stats()],
+                    "rtf": [rtf],
+                    "timing": [{"node": node_stats.summary(), "model": stage_stats.summary()}],
+                },
+                "result": (self.result_txt,)
+            }
+        except Exception as e:
+            print(f"sensevoice推理异常: {str(e)}")
+            pass
+        finally:
+            self.result_txt = None
+
+    def load_model(self, offline, device, cpu_threads, quantize=False):
+        # torch先导入，导入耗时报告才能分开统计
+        torch = lazy_import("torch")
+        AutoModel = lazy_import("funasr", "AutoModel")
+        # funasr导入时注册了自带的SenseVoiceSmall，在它之后导入本插件的model.py，
+        # 注册表里的同名类被替换成带分阶段计时/批处理/流式的实现
+        lazy_import(f"{__name__}.model")
+        snapshot_download = lazy_import("modelscope", "snapshot_download")
         # 使用示例
         comfyui_root = get_comfyui_root()
         #comfyui_root = None
         # print("ComfyUI根目录:", comfyui_root)
 
-        try:
-            if comfyui_root is None:
-                self.model_dir = "iic/SenseVoiceSmall"
-                snapshot_download(model_id="iic/SenseVoiceSmall")
-            else:
-                #self.model_dir = os.path.join(now_dir, "models", "checkpoints", "SenseVoiceSmall")
-                self.model_dir = os.path.join(comfyui_root, "models", "checkpoints", "SenseVoiceSmall")
-                snapshot_download(model_id="iic/SenseVoiceSmall", local_dir=self.model_dir)
-
-            if self.model is None:
-                self.model = AutoModel(
-                    model=self.model_dir,
-                    trust_remote_code=True,
-                    # remote_code="./model.py",
-                    vad_model="fsmn-vad",
-                    vad_kwargs={"max_single_segment_time": 30000},
-                    disable_update=True,
-                    device="cuda:0",
+        # 本地清单校验通过后不再调用snapshot_download，热路径没有网络请求
+        offline = offline or os.environ.get("SENSEVOICE_OFFLINE", "0") == "1"
+        if comfyui_root is None:
+            local_dir = None
+        else:
+            #local_dir = os.path.join(now_dir, "models", "checkpoints", "SenseVoiceSmall")
+            local_dir = os.path.join(comfyui_root, "models", "checkpoints", "SenseVoiceSmall")
+        self.model_dir = resolve_model_dir(
+            "iic/SenseVoiceSmall",
+            local_dir=local_dir,
+            offline=offline,
+            downloader=snapshot_download,
+        )
+
+        # 模型由进程内共享的注册表持有，多个节点/工作流复用同一份权重
+        vad_kwargs = {"max_single_segment_time": 30000}
+        device = resolve_device(device)
+        model_kwargs = {}
+        if device == "cpu":
+            # VAD和ASR使用同样的线程数，避免两个模型各自设置线程导致核心争抢
+            ncpu = configure_cpu_threads(cpu_threads, device=device)
+            vad_kwargs["ncpu"] = ncpu
+            model_kwargs["ncpu"] = ncpu
+        if quantize and device != "cpu":
+            print(f"int8动态量化只支持cpu，{device}上使用fp32模型")
+            quantize = False
+        dtype = "int8" if quantize else "fp32"
+
+        def build():
+            model = AutoModel(
+                model=self.model_dir,
+                # 模型类已经在上面注册，不再让funasr从当前工作目录导入model.py
+                trust_remote_code=False,
+                vad_model="fsmn-vad",
+                vad_kwargs=vad_kwargs,
+                disable_update=True,
+                device=device,
+                **model_kwargs,
+            )
+            if quantize:
+                from .utils.quantize import quantize_dynamic_int8
+
+                # 只量化ASR模型，VAD模型很小保持fp32
+                quantize_dynamic_int8(model.model)
+            return model
+
+        model_key = model_registry.make_key(self.model_dir, device, vad_kwargs, dtype)
+        model = model_registry.get(model_key, build)
+        self.model_key = model_key
+        if os.environ.get("SENSEVOICE_IMPORT_REPORT", "0") == "1" and not STTNode._import_reported:
+            STTNode._import_reported = True
+            print("sensevoice依赖导入耗时:\n" + format_import_report())
+        self.dtype = dtype
+        return model, device
+
+    def transcribe(self, audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s,
+                   audio=None, file_path_list=None, offline=False, device="cuda:0", cpu_threads=0,
+                   use_cache=True, quantize=False):
+        """返回 (每个输入对应的文本列表, RTF)，异常直接抛出"""
+        torch = lazy_import("torch")
+        # 节点级别的分阶段耗时，模型内部各阶段（fbank/encoder/解码等）由model.py记录到同一个统计里
+        timer = StageTimer()
+        model, device = self.load_model(offline, device, cpu_threads, quantize)
+        timer.mark("load_model")
+
+        if audio is not None:
+            items = [audio]
+        elif file_path_list:
+            items = list(file_path_list)
+        elif isinstance(audio_path, (list, tuple)):
+            items = list(audio_path)
+        else:
+            items = [audio_path]
+        # AUDIO在内存中转成16k单声道波形直接送入模型，路径保持不变交给funasr读取
+        items = [audio_to_waveform(item) if is_audio_item(item) else item for item in items]
+        timer.mark("prepare_audio")
+
+        texts = [None] * len(items)
+        cache_keys = [None] * len(items)
+        if use_cache:
+            revision = model_revision(self.model_dir)
+            for i, item in enumerate(items):
+                cache_keys[i] = result_cache.make_key(
+                    result_cache.audio_digest(item),
+                    language=language,
+                    use_itn=use_itn,
+                    merge_vad=merge_vad,
+                    merge_length_s=merge_length_s,
+                    revision=revision,
+                    dtype=self.dtype,
                 )
+                texts[i] = result_cache.get(cache_keys[i])
+        pending = [i for i in range(len(items)) if texts[i] is None]
+        timer.mark("cache_lookup")
+
+        # 按时长排序分桶，每个桶一次model.generate，结果按输入顺序返回
+        durations = [audio_duration(items[i]) for i in pending]
+        time_start = time.perf_counter()
+        for batch in plan_batches(durations, batch_size_s):
+            batch = [pending[j] for j in batch]
+            # 同一个模型的generate会改写共享的kwargs，多个节点/队列线程必须串行调用
+            with model_registry.lock_for(self.model_key), torch.inference_mode():
+                res = model.generate(
+                    input=[items[i] for i in batch],
+                    cache={},
+                    fs=16000,
+                    language=language,  # "zh", "en", "yue", "ja", "ko", "nospeech"
+                    use_itn=use_itn,
+                    batch_size_s=batch_size_s,
+                    merge_vad=merge_vad,
+                    merge_length_s=merge_length_s,
+                )
+            for i, r in zip(batch, res):
+                texts[i] = re.sub(r'<\|.*?\|>', '', r["text"])
+                if cache_keys[i] is not None:
+                    result_cache.put(cache_keys[i], texts[i])
+        # print(text)
+        timer.mark("generate")
+
+        # 实时率 RTF = 推理耗时 / 音频时长
+        elapsed = time.perf_counter() - time_start
+        audio_seconds = sum(durations)
+        node_stats.record(timer.times, audio_seconds, device=device, inputs=len(items))
+        rtf = elapsed / audio_seconds if audio_seconds > 0 else 0.0
+        print(f"sensevoice推理完成: device={device}, 音频{audio_seconds:.2f}s, 耗时{elapsed:.2f}s, RTF={rtf:.3f}")
+        return texts, rtf
+
+class STTSubmitNode(STTNode):
+    """把识别任务提交到后台队列，立即返回任务id，工作流的其它分支可以继续执行"""
+
+    RETURN_TYPES = ("STT_JOB",)
+    RETURN_NAMES = ("job",)
+    FUNCTION = "submit"
+    CATEGORY = "STT/SenseVoice"
+    OUTPUT_NODE = False
 
-                # print(f"模型加载成功--{audio_path}")
+    def submit(self, audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s,
+               audio=None, file_path_list=None, offline=False, device="cuda:0", cpu_threads=0,
+               use_cache=True, quantize=False):
+        # 每个任务使用独立的节点实例，避免后台线程之间共享状态
+        job_id = transcribe_queue.submit(
+            lambda: STTNode().transcribe(
+                audio_path, language, use_itn, batch_size_s, merge_vad, merge_length_s,
+                audio, file_path_list, offline, device, cpu_threads, use_cache, quantize
+            )[0]
+        )
+        print(f"识别任务已提交: {job_id}")
+        return (job_id,)
 
-            res = self.model.generate(
-                input=audio_path,
-                cache={},
-                language=language,  # "zh", "en", "yue", "ja", "ko", "nospeech"
-                use_itn=use_itn,
-                batch_size_s=batch_size_s,
-                merge_vad=merge_vad,
-                merge_length_s=merge_length_s,
-            )
 
-            self.result_txt = re.sub(r'<\|.*?\|>', '', res[0]["text"])
-            # print(text)
+class STTCollectNode:
+    """取回后台识别结果：wait阻塞等待，poll只查询状态，cancel取消任务"""
 
-            return [self.result_txt]
+    @classmethod
+    def INPUT_TYPES(s):
+        return {
+            "required": {
+                "job": ("STT_JOB",),
+                "mode": (["wait", "poll", "cancel"], {"default": "wait"}),
+                # 0 表示一直等待
+                "timeout_s": ("FLOAT", {"default": 0.0, "min": 0.0, "max": 3600.0, "step": 1.0}),
+            }
+        }
+
+    RETURN_TYPES = ("LIST",)
+    RETURN_NAMES = ("list_string",)
+    FUNCTION = "collect"
+    CATEGORY = "STT/SenseVoice"
+    OUTPUT_NODE = True
+
+    @classmethod
+    def IS_CHANGED(s, job, mode, timeout_s):
+        # 轮询模式下每次执行都要重新查询状态
+        return float("nan") if mode == "poll" else job
+
+    def collect(self, job, mode, timeout_s):
+        try:
+            if mode == "cancel":
+                cancelled = transcribe_queue.cancel(job)
+                return {"ui": {"status": ["cancelled" if cancelled else transcribe_queue.poll(job)]}, "result": ([],)}
+            status = transcribe_queue.poll(job)
+            if mode == "poll" and status in ("pending", "running"):
+                return {"ui": {"status": [status], "queue": [transcribe_queue.stats()]}, "result": ([],)}
+            texts = transcribe_queue.result(job, timeout=timeout_s or None)
+            return {"ui": {"status": ["done"]}, "result": (texts,)}
         except Exception as e:
-            print(f"sensevoice推理异常: {str(e)}")
-            pass
-        finally:
-            self.result_txt = None
+            print(f"sensevoice后台识别异常: {str(e)}")
+            return {"ui": {"status": ["error"]}, "result": ([],)}
+
 
 # class ShowTextNode:
 #     @classmethod
@@ -307,9 +533,40 @@ class STTNode:
 NODE_CLASS_MAPPINGS = {
     "VoiceRecorderNode":VoiceRecorderNode,
     "STTNode": STTNode,
+    "STTSubmitNode": STTSubmitNode,
+    "STTCollectNode": STTCollectNode,
     # "ShowTextNode":ShowTextNode
 }
-NODE_DISPLAY_NAME_MAPPINGS = {"VoiceRecorderNode": "voice record", "STTNode": "STT By SenseVoice"}
+NODE_DISPLAY_NAME_MAPPINGS = {
+    "VoiceRecorderNode": "voice record",
+    "STTNode": "STT By SenseVoice",
+    "STTSubmitNode": "STT By SenseVoice (background)",
+    "STTCollectNode": "STT Collect Result",
+}
+
+
+def prewarm(device="cuda:0"):
+    """后台线程中加载模型并做一次空推理，提前完成导入、权重加载和显存/缓冲区分配"""
+    def _run():
+        try:
+            time_start = time.perf_counter()
+            node = STTNode()
+            model, _ = node.load_model(False, device, 0)
+            torch = lazy_import("torch")
+            dummy = np.zeros(16000, dtype=np.float32)
+            # 和节点推理共用同一把模型锁，预热期间到来的识别请求会等预热结束
+            with model_registry.lock_for(node.model_key), torch.inference_mode():
+                # generate只会跑VAD（静音没有语音段），再单独跑一次ASR模型
+                model.generate(input=dummy, cache={}, fs=16000)
+                model.inference(dummy, fs=16000, language="auto", use_itn=False)
+            print(f"sensevoice预热完成，耗时{time.perf_counter() - time_start:.2f}s")
+        except Exception as e:
+            print(f"sensevoice预热失败: {str(e)}")
+
+    thread = threading.Thread(target=_run, name="sensevoice-prewarm", daemon=True)
+    thread.start()
+    return thread
+
 
 # 主程序入口 ---------------------------------------------------------
 # if __name__ == "__main__":
@@ -329,3 +586,10 @@ def get_comfyui_root():
     else:
         # 若无法获取主模块路径，回退到当前工作目录
         return None
+
+
+# 启用 SENSEVOICE_PREWARM=1 时在ComfyUI启动后台预热模型，默认不加载任何重量级依赖
+if os.environ.get("SENSEVOICE_PREWARM", "0") == "1":
+    prewarm(os.environ.get("SENSEVOICE_PREWARM_DEVICE", "cuda:0"))
+if os.environ.get("SENSEVOICE_IMPORT_REPORT", "0") == "1":
+    print(f"sensevoice插件导入耗时: {(time.perf_counter() - _import_start) * 1000:.1f} ms")
@@ -0,0 +1,131 @@
+# -*- encoding: utf-8 -*-
+"""Parity, latency and peak memory of the eager vs fused (SDPA) SANM attention.
+
+Each (mode, T) memory measurement runs in a fresh process so the peak is not
+hidden by an earlier, larger allocation (CUDA: max_memory_allocated, CPU:
+peak RSS growth during the forward).
+
+    python benchmarks/bench_attention.py --lengths 100 500 1000 2000 5000 --device cpu
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import MultiHeadedAttentionSANM, sequence_mask  # noqa: E402
+
+# SenseVoiceSmall encoder attention: 4 heads, 512 dims, fsmn kernel 11
+N_HEAD, N_FEAT, KERNEL = 4, 512, 11
+
+
+def build(device, dtype):
+    torch.manual_seed(0)
+    layer = MultiHeadedAttentionSANM(N_HEAD, N_FEAT, N_FEAT, 0.0, KERNEL).to(device, dtype).eval()
+    return layer
+
+
+def inputs(batch, length, device, dtype):
+    torch.manual_seed(1)
+    x = torch.randn(batch, length, N_FEAT, device=device, dtype=dtype)
+    # ragged batch: the last utterance is 3/4 of the longest
+    lengths = torch.full((batch,), length, device=device)
+    lengths[-1] = max(1, length * 3 // 4)
+    mask = sequence_mask(lengths, maxlen=length, device=device)[:, None, :]
+    return x, mask, lengths
+
+
+def run(layer, use_sdpa, x, mask):
+    layer.use_sdpa = use_sdpa
+    with torch.inference_mode():
+        return layer(x, mask)
+
+
+def parity(args, dtype):
+    layer = build(args.device, dtype)
+    for length in args.lengths:
+        x, mask, lengths = inputs(args.batch, length, args.device, dtype)
+        eager = run(layer, False, x, mask)
+        fused = run(layer, True, x, mask)
+        valid = sequence_mask(lengths, maxlen=length, device=args.device).bool()
+        diff = (eager - fused).abs()[valid].max().item()
+        print(f"parity T={length:5d}: max abs diff {diff:.2e}")
+
+
+def peak_rss():
+    """Peak resident set of this process in bytes.
+
+    ``ru_maxrss`` survives ``execve`` on Linux, so a spawned child would start
+    with the parent's high-water mark; ``VmHWM`` is per address space.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(queue, device, dtype, batch, length, use_sdpa, repeat):
+    layer = build(device, dtype)
+    x, mask, _ = inputs(batch, length, device, dtype)
+    # RSS is a high-water mark, so the CPU baseline is taken before the first forward
+    rss_base = peak_rss()
+    run(layer, use_sdpa, x, mask)  # warm up kernels and allocator
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated()
+    else:
+        base = rss_base
+    time_start = time.perf_counter()
+    for _ in range(repeat):
+        run(layer, use_sdpa, x, mask)
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+        peak = torch.cuda.max_memory_allocated() - base
+    else:
+        peak = peak_rss() - base
+    queue.put(((time.perf_counter() - time_start) / repeat, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lengths", type=int, nargs="+", default=[100, 500, 1000, 2000, 5000])
+    parser.add_argument("--batch", type=int, default=2)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16", "bfloat16"])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    dtype = getattr(torch, args.dtype)
+
+    parity(args, dtype)
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'T':>6s} {'eager_ms':>10s} {'sdpa_ms':>10s} {'eager_peak_MB':>14s} {'sdpa_peak_MB':>13s}")
+    for length in args.lengths:
+        row = []
+        for use_sdpa in (False, True):
+            queue = ctx.Queue()
+            proc = ctx.Process(
+                target=measure, args=(queue, args.device, dtype, args.batch, length, use_sdpa, args.repeat)
+            )
+            proc.start()
+            row.append(queue.get())
+            proc.join()
+        (t_eager, m_eager), (t_sdpa, m_sdpa) = row
+        print(
+            f"{length:6d} {t_eager * 1000:10.1f} {t_sdpa * 1000:10.1f} "
+            f"{m_eager / 2**20:14.1f} {m_sdpa / 2**20:13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
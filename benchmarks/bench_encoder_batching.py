@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+"""Padding ratio, parity and encoder time of padded vs bucketed vs packed batches.
+
+Segment lengths are drawn like VAD output (many short, a few long). The
+encoder has SenseVoiceSmall's layer sizes with random weights; ``--blocks``
+trims the depth to keep CPU runs short.
+
+    python benchmarks/bench_encoder_batching.py --segments 32 --blocks 10 --tp-blocks 4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import SenseVoiceSmall  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--segments", type=int, default=32)
+    parser.add_argument("--max-seconds", type=float, default=30)
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--tp-blocks", type=int, default=20)
+    parser.add_argument("--bucket-frames", type=int, default=12000)
+    parser.add_argument("--pack-frames", type=int, default=1000)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    model = SenseVoiceSmall(
+        encoder="SenseVoiceEncoderSmall",
+        encoder_conf={
+            "output_size": 512,
+            "attention_heads": 4,
+            "linear_units": 2048,
+            "num_blocks": args.blocks,
+            "tp_blocks": args.tp_blocks,
+            "dropout_rate": 0.0,
+            "kernel_size": 11,
+            "sanm_shfit": 0,
+        },
+        input_size=560,
+        vocab_size=25055,
+    ).to(args.device).eval()
+
+    # 60 ms LFR frames, lognormal durations capped at --max-seconds, +4 query frames
+    rng = np.random.default_rng(0)
+    seconds = np.minimum(rng.lognormal(1.0, 0.9, args.segments), args.max_seconds)
+    lengths = torch.tensor((seconds / 0.06).astype(int) + 4, device=args.device)
+    speech = torch.randn(args.segments, int(lengths.max()), 560, device=args.device)
+
+    def run(mode, max_frames=None):
+        with torch.inference_mode():
+            if mode == "pad":
+                out, _ = model.encoder(speech.clone(), lengths)
+                report = None
+            else:
+                out, _, report = model.encode_planned(speech.clone(), lengths, mode, max_frames)
+        if args.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        return out, report
+
+    ref, _ = run("pad")
+    valid = torch.arange(speech.size(1), device=args.device)[None, :] < lengths[:, None]
+    print(f"{args.segments} segments, {int(lengths.sum())} frames, longest {int(lengths.max())}")
+    print(f"{'mode':<8s} {'batches':>8s} {'pad_before':>11s} {'pad_after':>10s} {'ms':>9s} {'max_diff':>9s}")
+    for mode, max_frames in (("pad", None), ("bucket", args.bucket_frames), ("packed", args.pack_frames)):
+        out, report = run(mode, max_frames)
+        diff = (out - ref).abs()[valid].max().item()
+        time_start = time.perf_counter()
+        for _ in range(args.repeat):
+            run(mode, max_frames)
+        elapsed = (time.perf_counter() - time_start) / args.repeat
+        if report is None:
+            from utils.batch_planner import padding_ratio
+
+            ratio = padding_ratio(lengths.tolist())
+            report = {"batches": 1, "padding_ratio_before": ratio, "padding_ratio_after": ratio}
+        print(
+            f"{mode:<8s} {report['batches']:8d} {report['padding_ratio_before']:11.3f} "
+            f"{report['padding_ratio_after']:10.3f} {elapsed * 1000:9.1f} {diff:9.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- encoding: utf-8 -*-
+"""Compare the bulk fbank engine with the per-frame kaldi-native-fbank loop.
+
+Also a parity check: the exit code is 1 when the max abs log-mel diff
+exceeds ``--max-abs-diff``. ``ref_at_max`` is the knf log-mel value where
+that diff occurs. The largest diffs are in low-energy bins.
+
+    python benchmarks/bench_fbank.py --seconds 10 60 600
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import kaldi_native_fbank as knf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.frontend import WavFrontend  # noqa: E402
+
+
+def knf_loop(opts, waveform):
+    # the previous WavFrontend.fbank implementation
+    waveform = waveform * (1 << 15)
+    fbank_fn = knf.OnlineFbank(opts)
+    fbank_fn.accept_waveform(opts.frame_opts.samp_freq, waveform.tolist())
+    frames = fbank_fn.num_frames_ready
+    mat = np.empty([frames, opts.mel_opts.num_bins])
+    for i in range(frames):
+        mat[i, :] = fbank_fn.get_frame(i)
+    return mat.astype(np.float32)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - time_start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, nargs="+", default=[10, 60, 600])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-abs-diff", type=float, default=1e-2)
+    args = parser.parse_args()
+
+    frontend = WavFrontend(dither=0.0)
+    rng = np.random.default_rng(0)
+    print(f"{'audio_s':>8s} {'knf_loop_ms':>12s} {'bulk_ms':>10s} {'bulk_i16_ms':>12s} {'speedup':>8s} {'max_abs_diff':>13s} {'ref_at_max':>11s} {'p99.99_diff':>12s}")
+    worst = 0.0
+    for seconds in args.seconds:
+        waveform = (rng.standard_normal(int(seconds * 16000)) * 0.1).astype(np.float32)
+        pcm16 = (np.clip(waveform, -1, 1) * 32767).astype(np.int16)
+        t_loop, ref = best_of(lambda: knf_loop(frontend.opts, waveform), args.repeat)
+        t_bulk, feat = best_of(lambda: frontend.fbank(waveform)[0], args.repeat)
+        t_i16, _ = best_of(lambda: frontend.fbank(pcm16)[0], args.repeat)
+        diff = np.abs(ref - feat)
+        at_max = np.unravel_index(diff.argmax(), diff.shape)
+        worst = max(worst, float(diff.max()))
+        print(
+            f"{seconds:8.0f} {t_loop * 1000:12.1f} {t_bulk * 1000:10.1f} {t_i16 * 1000:12.1f} "
+            f"{t_loop / t_bulk:7.1f}x {diff.max():13.2e} {ref[at_max]:11.3f} {np.quantile(diff, 0.9999):12.2e}"
+        )
+    if worst > args.max_abs_diff:
+        print(f"fbank differs from knf by {worst:.2e} > {args.max_abs_diff}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# -*- encoding: utf-8 -*-
+"""Per-chunk cost of chunked SANM attention: torch.cat k/v cache vs the KVCache ring.
+
+Steps one encoder-sized attention layer over thousands of chunks and
+prints the median step time per window of the stream and the cache size at
+the end. With the ring the numbers stay flat and the cache buffers are
+never reallocated; the cat cache copies its whole history every step and,
+with ``look_back == -1``, keeps growing.
+
+    python benchmarks/bench_kv_cache.py --chunks 4000 --chunk-size 0 6 3 --look-back 16
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_attention import KERNEL, N_FEAT, N_HEAD  # noqa: E402
+from model import KVCache, MultiHeadedAttentionSANM  # noqa: E402
+
+
+def run(layer, xs, chunk_size, look_back, ring, max_cache_frames):
+    if ring:
+        capacity = look_back * chunk_size[1] if look_back > 0 else max_cache_frames
+        cache = {"kv": KVCache(capacity, chunk=chunk_size[1] + chunk_size[2])}
+    else:
+        cache = None
+    latencies = np.empty(len(xs))
+    data_ptrs = set()
+    with torch.inference_mode():
+        for i, x in enumerate(xs):
+            time_start = time.perf_counter()
+            _, cache = layer.forward_chunk(x, cache, chunk_size, look_back)
+            latencies[i] = time.perf_counter() - time_start
+            if ring and i >= 1:
+                data_ptrs.add(cache["kv"].k.data_ptr())
+    cache_bytes = cache["kv"].nbytes() if ring else 2 * cache["k"].numel() * cache["k"].element_size()
+    return latencies, cache_bytes, len(data_ptrs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=4000)
+    parser.add_argument("--chunk-size", type=int, nargs=3, default=[0, 6, 3])
+    parser.add_argument("--look-back", type=int, default=16)
+    parser.add_argument("--max-cache-frames", type=int, default=1024)
+    parser.add_argument("--windows", type=int, default=8)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    layer = MultiHeadedAttentionSANM(N_HEAD, N_FEAT, N_FEAT, 0.0, KERNEL).to(args.device).eval()
+    step = args.chunk_size[1] + args.chunk_size[2]
+    xs = [torch.randn(1, step, N_FEAT, device=args.device) for _ in range(64)]
+    xs = [xs[i % len(xs)] for i in range(args.chunks)]
+
+    per_window = args.chunks // args.windows
+    header = " ".join(f"{'w%d_us' % w:>8s}" for w in range(args.windows))
+    print(f"{args.chunks} chunks of {tuple(args.chunk_size)}, median step time per window of {per_window} chunks")
+    print(f"{'cache':<6s} {'look_back':>9s} {header} {'cache_KB':>9s} {'buffers':>7s}")
+    for look_back in (args.look_back, -1):
+        for ring in (False, True):
+            latencies, cache_bytes, buffers = run(
+                layer, xs, args.chunk_size, look_back, ring, args.max_cache_frames
+            )
+            medians = [
+                np.median(latencies[w * per_window : (w + 1) * per_window]) * 1e6 for w in range(args.windows)
+            ]
+            row = " ".join(f"{m:8.0f}" for m in medians)
+            name = "ring" if ring else "cat"
+            print(f"{name:<6s} {look_back:9d} {row} {cache_bytes / 1024:9.0f} {buffers if ring else '-':>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -*- encoding: utf-8 -*-
+"""Compare strided LFR stacking with the previous per-frame loop.
+
+    python benchmarks/bench_lfr.py --seconds 1 60 600 3600
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.frontend import WavFrontend  # noqa: E402
+
+
+def lfr_loop(inputs, lfr_m, lfr_n):
+    # the previous WavFrontend.apply_lfr implementation
+    LFR_inputs = []
+    T = inputs.shape[0]
+    T_lfr = int(np.ceil(T / lfr_n))
+    left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
+    inputs = np.vstack((left_padding, inputs))
+    T = T + (lfr_m - 1) // 2
+    for i in range(T_lfr):
+        if lfr_m <= T - i * lfr_n:
+            LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
+        else:
+            num_padding = lfr_m - (T - i * lfr_n)
+            frame = inputs[i * lfr_n :].reshape(-1)
+            for _ in range(num_padding):
+                frame = np.hstack((frame, inputs[-1]))
+            LFR_inputs.append(frame)
+    return np.vstack(LFR_inputs).astype(np.float32)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - time_start)
+    return best, out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, nargs="+", default=[1, 60, 600, 3600])
+    parser.add_argument("--lfr-m", type=int, default=7)
+    parser.add_argument("--lfr-n", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'audio_s':>8s} {'frames':>8s} {'loop_ms':>10s} {'strided_ms':>11s} {'speedup':>8s} {'equal':>6s}")
+    for seconds in args.seconds:
+        # 10 ms frame shift, 80 mel bins
+        feats = rng.standard_normal((int(seconds * 100), 80)).astype(np.float32)
+        t_loop, ref = best_of(lambda: lfr_loop(feats, args.lfr_m, args.lfr_n), args.repeat)
+        t_new, out = best_of(lambda: WavFrontend.apply_lfr(feats, args.lfr_m, args.lfr_n), args.repeat)
+        print(
+            f"{seconds:8.0f} {feats.shape[0]:8d} {t_loop * 1000:10.2f} {t_new * 1000:11.2f} "
+            f"{t_loop / t_new:7.1f}x {str(np.array_equal(ref, out)):>6s}"
+        )
+
+
+if __name__ == "__main__":
+    main()
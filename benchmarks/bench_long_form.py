@@ -0,0 +1,149 @@
+# -*- encoding: utf-8 -*-
+"""Peak memory and time of long-form windowed encoding vs full self-attention.
+
+Synthetic audio (tones in noise) goes through the numpy WavFrontend, then
+the SenseVoice encoder with random weights. Every (mode, duration) runs in
+a fresh process; the peak is measured from after feature extraction, so it
+covers the encoder and CTC only (features themselves grow linearly, about
+134 MB per hour). Long-form peaks should stay flat from 1 min to 1 h, full
+attention is only run up to ``--full-max-minutes``.
+
+First, a parity check: on ``--check-minutes`` of audio (short enough for
+full attention) the stitched ``encode_long_form`` ids are compared with
+the argmax of the full-length encoder output. With random weights about
+2-5% of frames differ, because each window only sees its own context. A
+misaligned stitch gives about 46%. The exit code is 1 when the mismatch
+rate exceeds ``--max-mismatch``.
+
+    python benchmarks/bench_long_form.py --minutes 1 10 60 --blocks 50 --tp-blocks 20
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_attention import peak_rss  # noqa: E402
+from model import SenseVoiceSmall  # noqa: E402
+from utils.frontend import WavFrontend  # noqa: E402
+
+
+def build(args):
+    torch.manual_seed(0)
+    return SenseVoiceSmall(
+        encoder="SenseVoiceEncoderSmall",
+        encoder_conf={
+            "output_size": 512,
+            "attention_heads": 4,
+            "linear_units": 2048,
+            "num_blocks": args.blocks,
+            "tp_blocks": args.tp_blocks,
+            "dropout_rate": 0.0,
+            "kernel_size": 11,
+            "sanm_shfit": 0,
+        },
+        input_size=560,
+        vocab_size=25055,
+    ).to(args.device).eval()
+
+
+def synthetic_features(minutes):
+    """LFR features of ``minutes`` of tones in noise, computed one minute at a time."""
+    frontend = WavFrontend(cmvn_file=None, lfr_m=7, lfr_n=6, dither=0.0)
+    rng = np.random.default_rng(0)
+    t = np.arange(16000 * 60) / 16000
+    feats = []
+    for _ in range(int(np.ceil(minutes))):
+        tone = np.sin(2 * np.pi * rng.uniform(100, 1000) * t) * 0.3
+        waveform = (tone + rng.standard_normal(t.size) * 0.05).astype(np.float32)
+        feat, _ = frontend.fbank(waveform)
+        feats.append(frontend.lfr_cmvn(feat)[0])
+    feats = np.concatenate(feats)[: int(minutes * 1000)]
+    return torch.from_numpy(feats)
+
+
+def check_stitching(args):
+    """Fraction of frame ids where long-form decoding differs from full attention."""
+    model = build(args)
+    feats = synthetic_features(args.check_minutes).to(args.device)
+    speech = torch.cat([torch.randn(4, feats.size(1), device=args.device), feats])[None]
+    speech_lengths = torch.tensor([speech.size(1)], device=args.device)
+    with torch.inference_mode():
+        # the encoder scales its input in place
+        encoder_out, _ = model.encoder(speech.clone(), speech_lengths)
+        full = model.ctc.log_softmax(encoder_out).argmax(dim=-1)[0]
+        stitched = model.encode_long_form(speech, speech_lengths, args.window, args.overlap, args.batch_windows)[0]
+    if stitched.shape != full.shape:
+        return 1.0, feats.size(0)
+    return (stitched[4:] != full[4:]).float().mean().item(), feats.size(0)
+
+
+def measure(queue, args, minutes, long_form):
+    model = build(args)
+    feats = synthetic_features(minutes).to(args.device)
+    speech = torch.cat([torch.randn(4, feats.size(1), device=args.device), feats])[None]
+    speech_lengths = torch.tensor([speech.size(1)], device=args.device)
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        base = torch.cuda.memory_allocated()
+    else:
+        base = peak_rss()
+
+    time_start = time.perf_counter()
+    with torch.inference_mode():
+        if long_form:
+            model.encode_long_form(speech, speech_lengths, args.window, args.overlap, args.batch_windows)
+        else:
+            encoder_out, _ = model.encoder(speech, speech_lengths)
+            model.ctc.log_softmax(encoder_out).argmax(dim=-1)
+    if args.device.startswith("cuda"):
+        torch.cuda.synchronize()
+        peak = torch.cuda.max_memory_allocated() - base
+    else:
+        peak = peak_rss() - base
+    queue.put((time.perf_counter() - time_start, peak))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, nargs="+", default=[1, 10, 60])
+    parser.add_argument("--full-max-minutes", type=float, default=2)
+    parser.add_argument("--window", type=int, default=500)
+    parser.add_argument("--overlap", type=int, default=50)
+    parser.add_argument("--batch-windows", type=int, default=4)
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--tp-blocks", type=int, default=20)
+    parser.add_argument("--check-minutes", type=float, default=1)
+    parser.add_argument("--max-mismatch", type=float, default=0.1)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    mismatch, frames = check_stitching(args)
+    print(f"parity: {frames} frames, {mismatch:.2%} of long-form ids differ from full attention")
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'minutes':>8s} {'mode':>10s} {'seconds':>9s} {'RTF':>7s} {'peak_MB':>9s}")
+    for minutes in args.minutes:
+        for long_form in (False, True):
+            if not long_form and minutes > args.full_max_minutes:
+                continue
+            queue = ctx.Queue()
+            proc = ctx.Process(target=measure, args=(queue, args, minutes, long_form))
+            proc.start()
+            elapsed, peak = queue.get()
+            proc.join()
+            mode = "long_form" if long_form else "full"
+            print(f"{minutes:8.1f} {mode:>10s} {elapsed:9.1f} {elapsed / (minutes * 60):7.3f} {peak / 2**20:9.1f}")
+    if mismatch > args.max_mismatch:
+        print(f"long-form ids differ from full attention on {mismatch:.2%} of frames > {args.max_mismatch:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# -*- encoding: utf-8 -*-
+"""Per-chunk latency of WavFrontendOnline over a long simulated stream.
+
+Prints p50/p99 latency per time window; with the buffered stream state the
+numbers stay flat from the first to the last window and the buffer
+capacities stop growing after the first chunks.
+
+    python benchmarks/bench_stream_frontend.py --minutes 60 --chunk-ms 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.frontend import WavFrontendOnline  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=60)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--windows", type=int, default=10)
+    parser.add_argument("--cmvn", default=None)
+    args = parser.parse_args()
+
+    frontend = WavFrontendOnline(cmvn_file=args.cmvn, lfr_m=7, lfr_n=6, dither=0.0)
+    chunk_samples = 16000 * args.chunk_ms // 1000
+    num_chunks = int(args.minutes * 60 * 1000 // args.chunk_ms)
+    # one second of noise reused as the source, the frontend only sees new chunks
+    source = (np.random.default_rng(0).standard_normal(16000 + chunk_samples) * 0.1).astype(np.float32)
+    input_lengths = np.array([chunk_samples])
+
+    latencies = np.empty(num_chunks)
+    capacities = []
+    frames = 0
+    for i in range(num_chunks):
+        offset = (i * chunk_samples) % 16000
+        chunk = source[None, offset : offset + chunk_samples]
+        time_start = time.perf_counter()
+        feats, feats_lengths = frontend.extract_fbank(chunk, input_lengths, is_final=i == num_chunks - 1)
+        latencies[i] = time.perf_counter() - time_start
+        frames += int(np.sum(feats_lengths)) if np.size(feats) else 0
+        if i in (10, num_chunks - 2):
+            capacities.append((frontend.waveform_buffer.capacity, frontend.lfr_splice_cache.capacity))
+
+    print(f"{num_chunks} chunks of {args.chunk_ms} ms, {frames} LFR frames")
+    print(f"{'window_min':>12s} {'p50_us':>8s} {'p99_us':>8s} {'max_us':>8s}")
+    per_window = num_chunks // args.windows
+    for w in range(args.windows):
+        lat = latencies[w * per_window : (w + 1) * per_window] * 1e6
+        beg = w * per_window * args.chunk_ms / 60000
+        end = (w + 1) * per_window * args.chunk_ms / 60000
+        p50, p99 = np.percentile(lat, [50, 99])
+        print(f"{beg:5.1f}-{end:5.1f} {p50:8.1f} {p99:8.1f} {lat.max():8.1f}")
+    print(f"buffer capacity (waveform, splice) after 10 chunks: {capacities[0]}, at the end: {capacities[-1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- encoding: utf-8 -*-
+"""First-hypothesis latency and per-chunk cost of SenseVoiceSmall.inference_stream.
+
+The encoder has SenseVoiceSmall's layer sizes with random weights, so the
+text is meaningless; what is measured is when the first encoder step fires
+(audio latency) plus its compute time, and the compute per audio chunk.
+
+    python benchmarks/bench_streaming.py --seconds 30 --chunk-ms 100 --chunk-size 0 6 3 --look-back 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_long_form import build  # noqa: E402
+from utils.frontend import WavFrontend  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--chunk-ms", type=int, default=100)
+    parser.add_argument("--chunk-size", type=int, nargs=3, default=[0, 6, 3])
+    parser.add_argument("--look-back", type=int, default=8)
+    parser.add_argument("--blocks", type=int, default=50)
+    parser.add_argument("--tp-blocks", type=int, default=20)
+    parser.add_argument("--cmvn", default=None)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    args = parser.parse_args()
+
+    model = build(args)
+    frontend = WavFrontend(cmvn_file=args.cmvn, lfr_m=7, lfr_n=6, dither=0.0)
+    chunk = 16000 * args.chunk_ms // 1000
+    audio = (np.random.default_rng(0).standard_normal(int(args.seconds * 16000)) * 0.1).astype(np.float32)
+
+    cache = {}
+    latencies = []
+    first = None
+    with torch.inference_mode():
+        for beg in range(0, audio.size, chunk):
+            is_final = beg + chunk >= audio.size
+            time_start = time.perf_counter()
+            res, _ = model.inference_stream(
+                audio[beg : beg + chunk],
+                cache,
+                is_final=is_final,
+                frontend=frontend,
+                chunk_size=args.chunk_size,
+                look_back=args.look_back,
+                device=args.device,
+            )
+            if args.device.startswith("cuda"):
+                torch.cuda.synchronize()
+            latencies.append(time.perf_counter() - time_start)
+            if first is None and res[0]["frames"]:
+                first = ((beg + chunk) / 16000, latencies[-1])
+
+    latencies = np.array(latencies) * 1000
+    p50, p99 = np.percentile(latencies, [50, 99])
+    print(f"chunk_size={tuple(args.chunk_size)} look_back={args.look_back} audio chunks of {args.chunk_ms} ms")
+    print(f"first hypothesis: after {first[0] * 1000:.0f} ms of audio + {first[1] * 1000:.1f} ms compute")
+    print(f"per chunk: p50 {p50:.1f} ms  p99 {p99:.1f} ms  max {latencies.max():.1f} ms")
+    print(f"RTF {latencies.sum() / 1000 / args.seconds:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# -*- encoding: utf-8 -*-
+"""Check TorchWavFrontend against the numpy WavFrontend and time both.
+
+The exit code is 1 when the max abs feature diff exceeds ``--max-abs-diff``
+(about 1.25e-3 is expected on the default 10 s batch without CMVN).
+
+    python benchmarks/bench_torch_frontend.py --cmvn /path/to/SenseVoiceSmall/am.mvn --batch 8 --seconds 10
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.frontend import WavFrontend  # noqa: E402
+from utils.torch_frontend import TorchWavFrontend, pad_waveforms  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cmvn", default=None, help="am.mvn of the model, CMVN is skipped without it")
+    parser.add_argument("--batch", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--device", default="cuda:0" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-abs-diff", type=float, default=5e-3)
+    args = parser.parse_args()
+
+    frontend = WavFrontend(cmvn_file=args.cmvn, lfr_m=7, lfr_n=6, dither=0.0)
+    torch_frontend = TorchWavFrontend.from_frontend(frontend).to(args.device)
+
+    # ragged batch: 50% .. 100% of the requested duration
+    rng = np.random.default_rng(0)
+    lengths = (rng.uniform(0.5, 1.0, args.batch) * args.seconds * 16000).astype(int)
+    waveforms = [(rng.standard_normal(n) * 0.1).astype(np.float32) for n in lengths]
+
+    def run_numpy():
+        return [frontend.lfr_cmvn(frontend.fbank(w)[0])[0] for w in waveforms]
+
+    def run_torch():
+        with torch.inference_mode():
+            feats, feat_lengths = torch_frontend(*pad_waveforms(waveforms, device=args.device))
+        if args.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        return feats, feat_lengths
+
+    ref = run_numpy()
+    feats, feat_lengths = run_torch()
+    max_diff = 0.0
+    for i, r in enumerate(ref):
+        assert int(feat_lengths[i]) == r.shape[0], (i, int(feat_lengths[i]), r.shape)
+        max_diff = max(max_diff, float(np.abs(feats[i, : r.shape[0]].cpu().numpy() - r).max()))
+    print(f"parity: {len(ref)} utterances, max abs diff {max_diff:.2e}")
+
+    for name, fn in (("numpy", run_numpy), (f"torch[{args.device}]", run_torch)):
+        fn()
+        time_start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        elapsed = (time.perf_counter() - time_start) / args.repeat
+        print(f"{name:<16s}{elapsed * 1000:9.1f} ms/batch  {lengths.sum() / 16000 / elapsed:9.1f} audio s/s")
+    if max_diff > args.max_abs_diff:
+        print(f"TorchWavFrontend differs from WavFrontend by {max_diff:.2e} > {args.max_abs_diff}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
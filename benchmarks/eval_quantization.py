@@ -0,0 +1,140 @@
+# -*- encoding: utf-8 -*-
+"""Accuracy and CPU latency of the int8 dynamic-quantized SenseVoiceSmall vs fp32.
+
+Decodes a local jsonl manifest (``source`` audio path, ``target`` text, as
+in ``data/val_example.jsonl``) with both models and reports corpus CER and
+WER, their delta, per-utterance latency and the encoder time on fixed
+input lengths. ``--max-cer-delta`` turns it into a regression check: the
+exit code is 1 when int8 loses more than that (absolute CER).
+
+    python benchmarks/eval_quantization.py data/val_example.jsonl --model-dir /path/to/SenseVoiceSmall --threads 8
+"""
+import argparse
+import json
+import os
+import re
+import string
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.audio_utils import audio_duration  # noqa: E402
+from utils.quantize import quantize_dynamic_int8  # noqa: E402
+
+PUNCTUATION = set(string.punctuation) | set("，。！？、；：“”‘’（）《》【】…·「」『』～")
+
+
+def normalize(text: str) -> str:
+    text = re.sub(r"<\|.*?\|>", "", text).lower()
+    return "".join(" " if ch in PUNCTUATION else ch for ch in text)
+
+
+def edit_distance(ref: list, hyp: list) -> int:
+    row = list(range(len(hyp) + 1))
+    for i, r in enumerate(ref, 1):
+        prev, row[0] = row[0], i
+        for j, h in enumerate(hyp, 1):
+            prev, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, prev + (r != h))
+    return row[-1]
+
+
+def error_rates(refs, hyps):
+    char_err = char_total = word_err = word_total = 0
+    for ref, hyp in zip(refs, hyps):
+        ref, hyp = normalize(ref), normalize(hyp)
+        ref_chars, hyp_chars = list(ref.replace(" ", "")), list(hyp.replace(" ", ""))
+        char_err += edit_distance(ref_chars, hyp_chars)
+        char_total += len(ref_chars)
+        word_err += edit_distance(ref.split(), hyp.split())
+        word_total += len(ref.split())
+    return char_err / max(char_total, 1), word_err / max(word_total, 1)
+
+
+def decode(model, items, args):
+    texts, latencies = [], []
+    with torch.inference_mode():
+        for item in items:
+            time_start = time.perf_counter()
+            res = model.generate(input=item["source"], language=args.language, use_itn=args.use_itn)
+            latencies.append(time.perf_counter() - time_start)
+            texts.append(res[0]["text"])
+    return texts, np.array(latencies)
+
+
+def encoder_latency(model, lengths, repeat):
+    encoder = model.model.encoder
+    dim = model.model.embed.embedding_dim
+    times = []
+    with torch.inference_mode():
+        for length in lengths:
+            xs = torch.randn(1, length, dim)
+            ilens = torch.tensor([length])
+            encoder(xs.clone(), ilens)
+            time_start = time.perf_counter()
+            for _ in range(repeat):
+                encoder(xs.clone(), ilens)
+            times.append((time.perf_counter() - time_start) / repeat)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("manifest")
+    parser.add_argument("--model-dir", required=True)
+    parser.add_argument("--limit", type=int, default=0)
+    parser.add_argument("--language", default="auto")
+    parser.add_argument("--use-itn", action="store_true")
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--encoder-lengths", type=int, nargs="+", default=[167, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cer-delta", type=float, default=None)
+    args = parser.parse_args()
+
+    from funasr import AutoModel
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    with open(args.manifest, "r", encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    items = [item for item in items if os.path.isfile(item["source"])]
+    if args.limit:
+        items = items[: args.limit]
+    if not items:
+        raise SystemExit(f"no audio from {args.manifest} found on disk")
+    refs = [item["target"] for item in items]
+    audio_seconds = sum(audio_duration(item["source"]) for item in items)
+
+    rows = {}
+    for dtype in ("fp32", "int8"):
+        model = AutoModel(model=args.model_dir, trust_remote_code=True, device="cpu", disable_update=True)
+        if dtype == "int8":
+            quantize_dynamic_int8(model.model)
+        hyps, latencies = decode(model, items, args)
+        cer, wer = error_rates(refs, hyps)
+        rows[dtype] = (cer, wer, latencies, encoder_latency(model, args.encoder_lengths, args.repeat))
+        del model
+
+    print(f"{len(items)} utterances, {audio_seconds:.1f} s of audio, {torch.get_num_threads()} threads")
+    print(f"{'dtype':<6s} {'CER':>7s} {'WER':>7s} {'ms/utt':>8s} {'RTF':>7s} " + " ".join(
+        f"{'enc_T%d_ms' % n:>12s}" for n in args.encoder_lengths
+    ))
+    for dtype, (cer, wer, latencies, enc) in rows.items():
+        print(
+            f"{dtype:<6s} {cer:7.4f} {wer:7.4f} {latencies.mean() * 1000:8.1f} "
+            f"{latencies.sum() / audio_seconds:7.4f} " + " ".join(f"{t * 1000:12.1f}" for t in enc)
+        )
+    cer_delta = rows["int8"][0] - rows["fp32"][0]
+    speedup = [f / q for f, q in zip(rows["fp32"][3], rows["int8"][3])]
+    print(f"CER delta {cer_delta:+.4f}, WER delta {rows['int8'][1] - rows['fp32'][1]:+.4f}, "
+          f"encoder speedup " + ", ".join(f"T={n}: {s:.2f}x" for n, s in zip(args.encoder_lengths, speedup)))
+    if args.max_cer_delta is not None and cer_delta > args.max_cer_delta:
+        print(f"int8 CER regression {cer_delta:.4f} > {args.max_cer_delta}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 
-import time
+import threading
+import numpy as np
 import torch
 from torch import nn
 import torch.nn.functional as F
@@ -13,7 +14,22 @@ from funasr.train_utils.device_funcs import force_gatherable
 from funasr.losses.label_smoothing_loss import LabelSmoothingLoss
 from funasr.metrics.compute_acc import compute_accuracy, th_accuracy
 from funasr.utils.load_utils import load_audio_text_image_video, extract_fbank
-from utils.ctc_alignment import ctc_forced_align
+
+try:
+    from .utils.batch_planner import packed_padding_ratio, padding_ratio, plan_buckets, plan_packs
+    from .utils.ctc_alignment import ctc_forced_align
+    from .utils.stage_timer import StageTimer, stage_stats
+    from .utils.torch_frontend import TorchWavFrontend, pad_waveforms
+except ImportError:
+    # imported as a top-level module (funasr remote_code, benchmarks), not as part of the node package
+    from utils.batch_planner import packed_padding_ratio, padding_ratio, plan_buckets, plan_packs
+    from utils.ctc_alignment import ctc_forced_align
+    from utils.stage_timer import StageTimer, stage_stats
+    from utils.torch_frontend import TorchWavFrontend, pad_waveforms
+
+_position_tables = {}
+_position_tables_lock = threading.Lock()
+
 
 class SinusoidalPositionEncoder(torch.nn.Module):
     """ """
@@ -40,12 +56,36 @@ class SinusoidalPositionEncoder(torch.nn.Module):
         encoding = torch.cat([torch.sin(scaled_time), torch.cos(scaled_time)], dim=2)
         return encoding.type(dtype)
 
-    def forward(self, x):
+    def position_table(self, length: int, depth: int, dtype: torch.dtype, device) -> torch.Tensor:
+        """Encodings of positions 1..``length`` as a ``(1, length, depth)`` slice of a shared table.
+
+        Tables are cached per (depth, dtype, device) and grow geometrically, so
+        longer inputs and streams that keep going only pay when the table grows.
+        """
+        key = (depth, dtype, str(device))
+        table = _position_tables.get(key)
+        if table is None or table.size(1) < length:
+            with _position_tables_lock:
+                table = _position_tables.get(key)
+                if table is None or table.size(1) < length:
+                    capacity = max(length, 2 * table.size(1) if table is not None else 512)
+                    # a plain tensor, usable outside inference_mode as well
+                    with torch.inference_mode(False), torch.no_grad():
+                        positions = torch.arange(1, capacity + 1, device=device)[None, :]
+                        table = self.encode(positions, depth, dtype)
+                    _position_tables[key] = table
+        return table[:, :length]
+
+    def forward(self, x, start_idx: int = 0):
         batch_size, timesteps, input_dim = x.size()
-        positions = torch.arange(1, timesteps + 1, device=x.device)[None, :]
-        position_encoding = self.encode(positions, input_dim, x.dtype).to(x.device)
+        if torch.jit.is_tracing() or torch.onnx.is_in_onnx_export():
+            # keep the length symbolic in exported graphs
+            positions = torch.arange(1, start_idx + timesteps + 1, device=x.device)[None, :]
+            position_encoding = self.encode(positions, input_dim, x.dtype).to(x.device)
+            return x + position_encoding[:, start_idx:]
+        position_encoding = self.position_table(start_idx + timesteps, input_dim, x.dtype, x.device)
 
-        return x + position_encoding
+        return x + position_encoding[:, start_idx:]
 
 
 class PositionwiseFeedForward(torch.nn.Module):
@@ -71,6 +111,81 @@ class PositionwiseFeedForward(torch.nn.Module):
         return self.w_2(self.dropout(self.activation(self.w_1(x))))
 
 
+class KVCache:
+    """Fixed-capacity key/value history of one attention layer for chunked inference.
+
+    Keys and values live in preallocated (#batch, n_head, sink + capacity +
+    chunk, d_k) buffers: ``sink`` pinned frames that are never evicted (the
+    prompt queries), a ring of the ``capacity`` most recent frames and a slot
+    for the chunk being attended. Attention has no positional bias over keys,
+    so the ring is attended in place without unrolling; the per-chunk cost is
+    constant and the steady state allocates nothing. The chunk slot only
+    grows when a chunk is longer than any before.
+    """
+
+    def __init__(self, capacity: int, sink: int = 0, chunk: int = 16):
+        self.capacity = capacity
+        self.sink = sink
+        self.chunk = chunk
+        self.k = self.v = self.valid = None
+        self.length = 0  # committed frames, at most sink + capacity
+        self.pos = 0  # next ring slot
+
+    def _allocate(self, k_h, chunk):
+        b, h, _, d = k_h.shape
+        history = self.sink + self.capacity
+        k = k_h.new_zeros(b, h, history + chunk, d)
+        v = k_h.new_zeros(b, h, history + chunk, d)
+        valid = torch.zeros(b, 1, history + chunk, dtype=torch.bool, device=k_h.device)
+        if self.k is not None:
+            k[:, :, :history] = self.k[:, :, :history]
+            v[:, :, :history] = self.v[:, :, :history]
+            valid[:, :, :history] = self.valid[:, :, :history]
+        self.k, self.v, self.valid, self.chunk = k, v, valid, chunk
+
+    def attend(self, k_h, v_h):
+        """Keys, values and key mask (None once the history is full) of the history plus this chunk."""
+        t = k_h.size(2)
+        if self.k is None or t > self.chunk:
+            self._allocate(k_h, max(t, self.chunk))
+        history = self.sink + self.capacity
+        end = history + t
+        self.k[:, :, history:end].copy_(k_h)
+        self.v[:, :, history:end].copy_(v_h)
+        self.valid[:, :, history:end] = True
+        mask = None if self.length >= history else self.valid[:, :, :end]
+        return self.k[:, :, :end], self.v[:, :, :end], mask
+
+    def commit(self, n: int):
+        """Move the first ``n`` frames of the attended chunk into the history, evicting the oldest."""
+        history = self.sink + self.capacity
+        src = history
+        if self.length < self.sink:
+            m = min(n, self.sink - self.length)
+            self._copy(src, self.length, m)
+            self.length += m
+            src += m
+            n -= m
+        if n > self.capacity:
+            src += n - self.capacity
+            n = self.capacity
+        while n > 0:
+            m = min(n, self.capacity - self.pos)
+            self._copy(src, self.sink + self.pos, m)
+            self.pos = (self.pos + m) % self.capacity
+            self.length = min(self.length + m, history)
+            src += m
+            n -= m
+
+    def _copy(self, src: int, dst: int, n: int):
+        self.k[:, :, dst : dst + n].copy_(self.k[:, :, src : src + n])
+        self.v[:, :, dst : dst + n].copy_(self.v[:, :, src : src + n])
+        self.valid[:, :, dst : dst + n] = True
+
+    def nbytes(self) -> int:
+        return 0 if self.k is None else 2 * self.k.numel() * self.k.element_size()
+
+
 class MultiHeadedAttentionSANM(nn.Module):
     """Multi-Head Attention layer.
 
@@ -119,6 +234,10 @@ class MultiHeadedAttentionSANM(nn.Module):
         right_padding = kernel_size - 1 - left_padding
         self.pad_fn = nn.ConstantPad1d((left_padding, right_padding), 0.0)
 
+    # eval-mode attention through F.scaled_dot_product_attention, which never
+    # materializes the (batch, head, time1, time2) scores; False restores the eager path
+    use_sdpa = True
+
     def forward_fsmn(self, inputs, mask, mask_shfit_chunk=None):
         b, t, d = inputs.size()
         if mask is not None:
@@ -137,6 +256,28 @@ class MultiHeadedAttentionSANM(nn.Module):
             x = x * mask
         return x
 
+    def forward_fsmn_chunk(self, inputs, context=None, stride=None):
+        """FSMN over a streaming chunk, continuing from the previous chunk's frames.
+
+        ``context`` holds the last left-padding frames before the previous
+        chunk's lookahead (zeros on the first chunk); the returned context
+        does the same for the first ``stride`` frames of ``inputs``.
+        """
+        b, t, d = inputs.size()
+        left_padding, right_padding = self.pad_fn.padding
+        if stride is None:
+            stride = t
+        if context is None:
+            context = inputs.new_zeros(b, left_padding, d)
+        x = torch.cat((context, inputs), dim=1)
+        context = x[:, stride : stride + left_padding]
+        x = F.pad(x.transpose(1, 2), (0, right_padding))
+        x = self.fsmn_block(x)
+        x = x.transpose(1, 2)
+        x += inputs
+        x = self.dropout(x)
+        return x, context
+
     def forward_qkv(self, x):
         """Transform query, key and value.
 
@@ -204,6 +345,40 @@ class MultiHeadedAttentionSANM(nn.Module):
 
         return self.linear_out(x)  # (batch, time1, d_model)
 
+    def forward_attention_sdpa(self, query, key, value, mask, mask_att_chunk_encoder=None):
+        """Fused equivalent of ``forward_attention(value, query @ key^T, mask, ...)``.
+
+        Args:
+            query (torch.Tensor): Pre-scaled query (#batch, n_head, time1, d_k).
+            key (torch.Tensor): Key (#batch, n_head, time2, d_k).
+            value (torch.Tensor): Value (#batch, n_head, time2, d_k).
+            mask (torch.Tensor): Mask (#batch, 1, time2) or (#batch, time1, time2).
+
+        Returns:
+            torch.Tensor: Output tensor (#batch, time1, d_model).
+
+        """
+        n_batch = value.size(0)
+        attn_mask = None
+        if mask is not None:
+            if mask_att_chunk_encoder is not None:
+                mask = mask * mask_att_chunk_encoder
+            attn_mask = mask.unsqueeze(1).ne(0)  # (batch, 1, *, time2), True = attend
+        x = F.scaled_dot_product_attention(
+            query,
+            key,
+            value,
+            attn_mask=attn_mask,
+            dropout_p=self.dropout.p if self.training else 0.0,
+            scale=1.0,
+        )  # (batch, head, time1, d_k)
+        if attn_mask is not None:
+            # rows without a single valid key are zeros in the eager path, some kernels give NaN
+            x = x.masked_fill(~attn_mask.any(dim=-1, keepdim=True), 0.0)
+        x = x.transpose(1, 2).reshape(n_batch, -1, self.h * self.d_k)  # (batch, time1, d_model)
+
+        return self.linear_out(x)  # (batch, time1, d_model)
+
     def forward(self, x, mask, mask_shfit_chunk=None, mask_att_chunk_encoder=None):
         """Compute scaled dot product attention.
 
@@ -221,6 +396,9 @@ class MultiHeadedAttentionSANM(nn.Module):
         q_h, k_h, v_h, v = self.forward_qkv(x)
         fsmn_memory = self.forward_fsmn(v, mask, mask_shfit_chunk)
         q_h = q_h * self.d_k ** (-0.5)
+        if self.use_sdpa and not self.training:
+            att_outs = self.forward_attention_sdpa(q_h, k_h, v_h, mask, mask_att_chunk_encoder)
+            return att_outs + fsmn_memory
         scores = torch.matmul(q_h, k_h.transpose(-2, -1))
         att_outs = self.forward_attention(v_h, scores, mask, mask_att_chunk_encoder)
         return att_outs + fsmn_memory
@@ -240,10 +418,15 @@ class MultiHeadedAttentionSANM(nn.Module):
 
         """
         q_h, k_h, v_h, v = self.forward_qkv(x)
-        if chunk_size is not None and look_back > 0 or look_back == -1:
+        # frames before the lookahead, the only ones that go into the cache
+        stride = k_h.size(2) - chunk_size[2] if chunk_size is not None else k_h.size(2)
+        kv_cache = cache.get("kv") if cache is not None else None
+        if kv_cache is not None:
+            k_h, v_h, kv_mask = kv_cache.attend(k_h, v_h)
+        elif chunk_size is not None and look_back > 0 or look_back == -1:
             if cache is not None:
-                k_h_stride = k_h[:, :, : -(chunk_size[2]), :]
-                v_h_stride = v_h[:, :, : -(chunk_size[2]), :]
+                k_h_stride = k_h[:, :, :stride, :]
+                v_h_stride = v_h[:, :, :stride, :]
                 k_h = torch.cat((cache["k"], k_h), dim=2)
                 v_h = torch.cat((cache["v"], v_h), dim=2)
 
@@ -254,12 +437,26 @@ class MultiHeadedAttentionSANM(nn.Module):
                     cache["v"] = cache["v"][:, :, -(look_back * chunk_size[1]) :, :]
             else:
                 cache_tmp = {
-                    "k": k_h[:, :, : -(chunk_size[2]), :],
-                    "v": v_h[:, :, : -(chunk_size[2]), :],
+                    "k": k_h[:, :, :stride, :],
+                    "v": v_h[:, :, :stride, :],
                 }
                 cache = cache_tmp
-        fsmn_memory = self.forward_fsmn(v, None)
+        if cache is not None:
+            fsmn_memory, cache["fsmn"] = self.forward_fsmn_chunk(v, cache.get("fsmn"), stride)
+        else:
+            fsmn_memory = self.forward_fsmn(v, None)
         q_h = q_h * self.d_k ** (-0.5)
+        if kv_cache is not None:
+            if self.use_sdpa and not self.training:
+                att_outs = self.forward_attention_sdpa(q_h, k_h, v_h, kv_mask)
+            else:
+                scores = torch.matmul(q_h, k_h.transpose(-2, -1))
+                att_outs = self.forward_attention(v_h, scores, kv_mask)
+            kv_cache.commit(stride)
+            return att_outs + fsmn_memory, cache
+        if self.use_sdpa and not self.training:
+            att_outs = self.forward_attention_sdpa(q_h, k_h, v_h, None)
+            return att_outs + fsmn_memory, cache
         scores = torch.matmul(q_h, k_h.transpose(-2, -1))
         att_outs = self.forward_attention(v_h, scores, None)
         return att_outs + fsmn_memory, cache
@@ -576,6 +773,106 @@ class SenseVoiceEncoderSmall(nn.Module):
         xs_pad = self.tp_norm(xs_pad)
         return xs_pad, olens
 
+    def forward_chunk(
+        self,
+        xs: torch.Tensor,
+        cache: list = None,
+        chunk_size: tuple = (0, 6, 3),
+        look_back: int = -1,
+        start_idx: int = 0,
+        max_cache_frames: int = 1024,
+        sink: int = 0,
+    ):
+        """One streaming step over ``xs`` (#batch, time, dim): new frames plus ``chunk_size[2]`` lookahead.
+
+        ``cache`` holds one attention cache per layer (a ``KVCache`` and the
+        FSMN left context) and is returned updated; pass None on the first
+        chunk. The k/v history keeps ``look_back * chunk_size[1]`` frames, or
+        the newest ``max_cache_frames`` for ``look_back == -1``, plus the
+        first ``sink`` frames. ``start_idx`` is the position of the first
+        frame in the stream. The lookahead frames are not cached, the next
+        step feeds them again.
+        """
+        encoders = [*self.encoders0, *self.encoders]
+        if cache is None:
+            capacity = look_back * chunk_size[1] if look_back > 0 else max_cache_frames
+            cache = [
+                {"kv": KVCache(capacity, sink, xs.size(1))} if look_back != 0 else {}
+                for _ in range(len(encoders) + len(self.tp_encoders))
+            ]
+        xs = xs * self.output_size() ** 0.5
+        xs = self.embed(xs, start_idx)
+        for i, encoder_layer in enumerate(encoders):
+            xs, cache[i] = encoder_layer.forward_chunk(xs, cache[i], chunk_size, look_back)
+        xs = self.after_norm(xs)
+        for i, encoder_layer in enumerate(self.tp_encoders, len(encoders)):
+            xs, cache[i] = encoder_layer.forward_chunk(xs, cache[i], chunk_size, look_back)
+        xs = self.tp_norm(xs)
+        return xs, cache
+
+    def pack_gap(self) -> int:
+        """Masked frames needed between packed segments so no FSMN kernel reaches across."""
+        layers = [*self.encoders0, *self.encoders, *self.tp_encoders]
+        return max(max(layer.self_attn.pad_fn.padding) for layer in layers)
+
+    def forward_packed(
+        self,
+        xs_pad: torch.Tensor,
+        ilens: torch.Tensor,
+        packs: list,
+    ):
+        """Encode with the segments of each pack concatenated into one sequence.
+
+        ``packs`` lists batch indices per packed sequence. Segments are
+        separated by ``pack_gap()`` masked frames, a block-diagonal
+        ``mask_att_chunk_encoder`` keeps attention inside each segment and
+        positions restart at every segment, so the valid frames match
+        ``forward``. The output is scattered back to the (batch, time) layout
+        of ``xs_pad``.
+        """
+        gap = self.pack_gap()
+        device = xs_pad.device
+        lengths = ilens.tolist()
+        seg_batch, seg_pack, seg_offset = [], [], []
+        pack_len = 0
+        for p, pack in enumerate(packs):
+            offset = 0
+            for i in pack:
+                seg_batch.append(i)
+                seg_pack.append(p)
+                seg_offset.append(offset)
+                offset += lengths[i] + gap
+            pack_len = max(pack_len, offset - gap)
+        seg_lens = torch.tensor([lengths[i] for i in seg_batch], device=device)
+        seg_starts = torch.cumsum(seg_lens, 0) - seg_lens
+        frame = torch.arange(int(seg_lens.sum()), device=device) - torch.repeat_interleave(seg_starts, seg_lens)
+        src_b = torch.repeat_interleave(torch.tensor(seg_batch, device=device), seg_lens)
+        dst_p = torch.repeat_interleave(torch.tensor(seg_pack, device=device), seg_lens)
+        dst_t = torch.repeat_interleave(torch.tensor(seg_offset, device=device), seg_lens) + frame
+
+        # segment id per packed frame, -1 for gaps and the tail of shorter packs
+        seg = torch.full((len(packs), pack_len), -1, dtype=torch.long, device=device)
+        seg[dst_p, dst_t] = torch.repeat_interleave(torch.arange(len(seg_batch), device=device), seg_lens)
+        masks = (seg >= 0).float()[:, None, :]
+        mask_att_chunk_encoder = (seg[:, :, None] == seg[:, None, :]).float()
+
+        position_encoding = self.embed.position_table(max(lengths), xs_pad.size(-1), xs_pad.dtype, device)[0]
+        packed = xs_pad.new_zeros(len(packs), pack_len, xs_pad.size(-1))
+        packed[dst_p, dst_t] = xs_pad[src_b, frame] * self.output_size() ** 0.5 + position_encoding[frame]
+
+        for encoder_layer in self.encoders0:
+            packed = encoder_layer(packed, masks, mask_att_chunk_encoder=mask_att_chunk_encoder)[0]
+        for encoder_layer in self.encoders:
+            packed = encoder_layer(packed, masks, mask_att_chunk_encoder=mask_att_chunk_encoder)[0]
+        packed = self.after_norm(packed)
+        for encoder_layer in self.tp_encoders:
+            packed = encoder_layer(packed, masks, mask_att_chunk_encoder=mask_att_chunk_encoder)[0]
+        packed = self.tp_norm(packed)
+
+        xs_out = packed.new_zeros(xs_pad.size(0), xs_pad.size(1), packed.size(-1))
+        xs_out[src_b, frame] = packed[dst_p, dst_t]
+        return xs_out, ilens.int()
+
 
 @tables.register("model_classes", "SenseVoiceSmall")
 class SenseVoiceSmall(nn.Module):
@@ -644,7 +941,82 @@ class SenseVoiceSmall(nn.Module):
             smoothing=kwargs.get("lsm_weight", 0.0),
             normalize_length=self.length_normalized_loss,
         )
-    
+        # TorchWavFrontend per (frontend, device); a plain dict so it stays out of state_dict
+        self.torch_frontends = {}
+
+    def get_torch_frontend(self, frontend, device):
+        key = (id(frontend), str(device))
+        torch_frontend = self.torch_frontends.get(key)
+        if torch_frontend is None:
+            torch_frontend = TorchWavFrontend.from_frontend(frontend).to(device)
+            self.torch_frontends[key] = torch_frontend
+        return torch_frontend
+
+    @staticmethod
+    def extract_feats_staged(audio_sample_list, frontend, timer):
+        """fbank and LFR+CMVN per utterance, charged to the ``fbank`` and ``lfr_cmvn`` timer stages.
+
+        Gives the same features as funasr's ``extract_fbank`` with its
+        ``WavFrontend`` (or with ``utils.frontend.WavFrontend``); any other
+        frontend runs in one call and is timed as ``fbank_lfr_cmvn``.
+        Returns ``(speech, speech_lengths)`` and the seconds spent.
+        """
+        time_before = timer.total
+        staged = hasattr(frontend, "lfr_cmvn") or hasattr(frontend, "snip_edges")
+        if not staged:
+            speech, speech_lengths = extract_fbank(audio_sample_list, data_type="sound", frontend=frontend)
+            timer.mark("fbank_lfr_cmvn")
+            return speech, speech_lengths, timer.total - time_before
+
+        # the kaldi fbank module funasr's WavFrontend itself uses
+        from funasr.frontends.wav_frontend import apply_cmvn, apply_lfr, kaldi
+
+        # same input handling as extract_fbank: one waveform per utterance, channels averaged
+        if isinstance(audio_sample_list, (np.ndarray, torch.Tensor)):
+            data = torch.as_tensor(audio_sample_list)
+            if data.dim() > 1 and data.shape[0] > 1:
+                data = data.mean(dim=0, keepdim=True)
+            waveforms = [data.reshape(-1)]
+        else:
+            waveforms = [torch.as_tensor(w) for w in audio_sample_list]
+
+        feats = []
+        for waveform in waveforms:
+            if hasattr(frontend, "lfr_cmvn"):
+                mat, _ = frontend.fbank(waveform.numpy())
+                timer.mark("fbank")
+                mat, _ = frontend.lfr_cmvn(mat)
+                feats.append(torch.from_numpy(mat))
+                timer.mark("lfr_cmvn")
+                continue
+            # funasr WavFrontend.forward, split into its two halves
+            length = waveform.shape[0]
+            if frontend.upsacle_samples:
+                waveform = waveform * (1 << 15)
+            mat = kaldi.fbank(
+                waveform.unsqueeze(0),
+                num_mel_bins=frontend.n_mels,
+                frame_length=min(frontend.frame_length, length / frontend.fs * 1000),
+                frame_shift=frontend.frame_shift,
+                dither=frontend.dither,
+                energy_floor=0.0,
+                window_type=frontend.window,
+                sample_frequency=frontend.fs,
+                snip_edges=frontend.snip_edges,
+            )
+            timer.mark("fbank")
+            if frontend.lfr_m != 1 or frontend.lfr_n != 1:
+                mat = apply_lfr(mat, frontend.lfr_m, frontend.lfr_n)
+            if frontend.cmvn is not None:
+                mat = apply_cmvn(mat, frontend.cmvn)
+            feats.append(mat)
+            timer.mark("lfr_cmvn")
+
+        speech_lengths = torch.tensor([feat.shape[0] for feat in feats], dtype=torch.int32)
+        speech = torch.nn.utils.rnn.pad_sequence(feats, batch_first=True).to(torch.float32)
+        timer.mark("lfr_cmvn")
+        return speech, speech_lengths, timer.total - time_before
+
     @staticmethod
     def from_pretrained(model:str=None, **kwargs):
         from funasr import AutoModel
@@ -744,6 +1116,111 @@ class SenseVoiceSmall(nn.Module):
 
         return encoder_out, encoder_out_lens
 
+    def encode_planned(
+        self,
+        speech: torch.Tensor,
+        speech_lengths: torch.Tensor,
+        mode: str = "bucket",
+        max_frames: int = None,
+    ):
+        """Run the encoder on a ragged batch without padding everything to the longest input.
+
+        ``bucket`` splits the batch into length buckets of at most
+        ``max_frames`` padded frames (default 12000); ``packed`` concatenates
+        segments into sequences of at most ``max_frames`` frames (default 1000,
+        attention cost grows with the square of the packed length). Returns
+        ``(encoder_out, encoder_out_lens, report)`` in the original batch order,
+        ``report`` carries the padding ratio before and after planning.
+        """
+        lengths = speech_lengths.tolist()
+        if mode == "packed":
+            gap = self.encoder.pack_gap()
+            batches = plan_packs(lengths, max_frames or 1000, gap)
+            after = packed_padding_ratio(lengths, batches, gap)
+        elif mode == "bucket":
+            batches = plan_buckets(lengths, max_frames or 12000)
+            after = padding_ratio(lengths, batches)
+        else:
+            raise ValueError(f"unknown encoder batching mode: {mode}")
+        report = {
+            "mode": mode,
+            "batches": len(batches),
+            "padding_ratio_before": padding_ratio(lengths),
+            "padding_ratio_after": after,
+        }
+
+        if mode == "packed":
+            encoder_out, encoder_out_lens = self.encoder.forward_packed(speech, speech_lengths, batches)
+            return encoder_out, encoder_out_lens, report
+
+        encoder_out = speech.new_zeros(speech.size(0), speech.size(1), self.encoder_output_size)
+        encoder_out_lens = speech_lengths.int()
+        for batch in batches:
+            maxlen = max(lengths[i] for i in batch)
+            index = torch.tensor(batch, device=speech.device)
+            out, _ = self.encoder(speech[index, :maxlen], speech_lengths[index])
+            if isinstance(out, tuple):
+                out = out[0]
+            encoder_out[index, :maxlen] = out
+        return encoder_out, encoder_out_lens, report
+
+    def encode_long_form(
+        self,
+        speech: torch.Tensor,
+        speech_lengths: torch.Tensor,
+        window: int = 500,
+        overlap: int = 50,
+        batch_windows: int = 4,
+        ban_emo_unk: bool = False,
+    ):
+        """Greedy CTC ids per encoder frame, encoding long inputs in overlapping windows.
+
+        ``speech`` carries the 4 prompt query frames in front of the features.
+        The features are cut into windows of ``window`` frames that overlap
+        their neighbours by ``2 * overlap`` frames; every window gets the
+        queries prepended and ``batch_windows`` windows are encoded at a time,
+        so encoder memory depends on the window and not on the input duration.
+        Each window keeps the ids of its central frames (the first and last
+        window also keep their outer edge); the query ids come from log-probs
+        averaged over all windows. Returns one LongTensor of ``4 + frames`` ids
+        per utterance, laid out like the argmax of the full-length encoder
+        output.
+        """
+        hop = window - 2 * overlap
+        if hop <= 0:
+            raise ValueError(f"long-form window {window} must be longer than twice the overlap {overlap}")
+        frame_ids = []
+        for i in range(speech.size(0)):
+            queries = speech[i, :4]
+            feats = speech[i, 4 : int(speech_lengths[i])]
+            frames = feats.size(0)
+            num_windows = max(1, -(-(frames - window) // hop) + 1)
+            starts = [k * hop for k in range(num_windows)]
+            pieces = []
+            query_logp = 0.0
+            for beg in range(0, num_windows, batch_windows):
+                batch = starts[beg : beg + batch_windows]
+                lengths = [min(window, frames - start) for start in batch]
+                xs = speech.new_zeros(len(batch), 4 + max(lengths), speech.size(-1))
+                xs[:, :4] = queries
+                for j, start in enumerate(batch):
+                    xs[j, 4 : 4 + lengths[j]] = feats[start : start + lengths[j]]
+                xs_lens = torch.tensor(lengths, device=speech.device) + 4
+                encoder_out, _ = self.encoder(xs, xs_lens)
+                if isinstance(encoder_out, tuple):
+                    encoder_out = encoder_out[0]
+                logits = self.ctc.ctc_lo(encoder_out)
+                if ban_emo_unk:
+                    logits[:, :, self.emo_dict["unk"]] = -float("inf")
+                query_logp = query_logp + torch.log_softmax(logits[:, :4].float(), dim=-1).sum(0)
+                ids = logits[:, 4:].argmax(dim=-1)
+                for j, k in enumerate(range(beg, beg + len(batch))):
+                    lo = 0 if k == 0 else overlap
+                    hi = lengths[j] if k == num_windows - 1 else overlap + hop
+                    pieces.append(ids[j, lo:hi])
+            frame_ids.append(torch.cat([query_logp.argmax(dim=-1)] + pieces))
+        return frame_ids
+
     def _calc_ctc_loss(
         self,
         encoder_out: torch.Tensor,
@@ -790,6 +1267,11 @@ class SenseVoiceSmall(nn.Module):
 
 
         meta_data = {}
+        device = kwargs["device"]
+        sync = None
+        if kwargs.get("timing_sync", False) and str(device).startswith("cuda"):
+            sync = torch.cuda.synchronize
+        timer = StageTimer(sync=sync)
         if (
             isinstance(data_in, torch.Tensor) and kwargs.get("data_type", "sound") == "fbank"
         ):  # fbank
@@ -800,7 +1282,6 @@ class SenseVoiceSmall(nn.Module):
                 speech_lengths = speech.shape[1]
         else:
             # extract fbank feats
-            time1 = time.perf_counter()
             audio_sample_list = load_audio_text_image_video(
                 data_in,
                 fs=frontend.fs,
@@ -808,19 +1289,36 @@ class SenseVoiceSmall(nn.Module):
                 data_type=kwargs.get("data_type", "sound"),
                 tokenizer=tokenizer,
             )
-            time2 = time.perf_counter()
-            meta_data["load_data"] = f"{time2 - time1:0.3f}"
-            speech, speech_lengths = extract_fbank(
-                audio_sample_list, data_type=kwargs.get("data_type", "sound"), frontend=frontend
-            )
-            time3 = time.perf_counter()
-            meta_data["extract_feat"] = f"{time3 - time2:0.3f}"
+            meta_data["load_data"] = f"{timer.mark('load_data'):0.3f}"
+            if kwargs.get("torch_frontend", False) and kwargs.get("data_type", "sound") == "sound":
+                # batched fbank/LFR/CMVN directly on the encoder device
+                torch_frontend = self.get_torch_frontend(frontend, device)
+                waveforms, waveform_lengths = pad_waveforms(audio_sample_list, device=device)
+                timer.mark("to_device")
+                speech, speech_lengths = torch_frontend.fbank(waveforms, waveform_lengths)
+                extract_time = timer.mark("fbank")
+                speech, speech_lengths = torch_frontend.lfr(speech, speech_lengths)
+                speech = torch_frontend.apply_cmvn(speech, speech_lengths)
+                speech_lengths = speech_lengths.to(torch.int32)
+                extract_time += timer.mark("lfr_cmvn")
+                meta_data["extract_feat"] = f"{extract_time:0.3f}"
+            elif kwargs.get("data_type", "sound") == "sound":
+                speech, speech_lengths, extract_time = self.extract_feats_staged(
+                    audio_sample_list, frontend, timer
+                )
+                meta_data["extract_feat"] = f"{extract_time:0.3f}"
+            else:
+                speech, speech_lengths = extract_fbank(
+                    audio_sample_list, data_type=kwargs.get("data_type", "sound"), frontend=frontend
+                )
+                meta_data["extract_feat"] = f"{timer.mark('fbank_lfr_cmvn'):0.3f}"
             meta_data["batch_data_time"] = (
                 speech_lengths.sum().item() * frontend.frame_shift * frontend.lfr_n / 1000
             )
 
-        speech = speech.to(device=kwargs["device"])
-        speech_lengths = speech_lengths.to(device=kwargs["device"])
+        speech = speech.to(device=device)
+        speech_lengths = speech_lengths.to(device=device)
+        timer.mark("to_device")
 
         language = kwargs.get("language", "auto")
         language_query = self.embed(
@@ -847,16 +1345,40 @@ class SenseVoiceSmall(nn.Module):
         input_query = torch.cat((language_query, event_emo_query), dim=1)
         speech = torch.cat((input_query, speech), dim=1)
         speech_lengths += 3
+        timer.mark("prompt_embed")
 
         # Encoder
-        encoder_out, encoder_out_lens = self.encoder(speech, speech_lengths)
+        frame_ids = None
+        long_form_window = kwargs.get("long_form_window", 0)
+        encoder_batching = kwargs.get("encoder_batching", "pad")
+        if long_form_window and int(speech_lengths.max()) - 4 > long_form_window:
+            # overlapping windows instead of self-attention over the whole input
+            frame_ids = self.encode_long_form(
+                speech,
+                speech_lengths,
+                long_form_window,
+                kwargs.get("long_form_overlap", 50),
+                kwargs.get("long_form_batch", 4),
+                kwargs.get("ban_emo_unk", False),
+            )
+            encoder_out, encoder_out_lens = speech, speech_lengths
+        elif encoder_batching != "pad" and speech.size(0) > 1:
+            # length buckets or packed segments instead of padding to the longest input
+            encoder_out, encoder_out_lens, meta_data["encoder_batching"] = self.encode_planned(
+                speech, speech_lengths, encoder_batching, kwargs.get("encoder_max_frames")
+            )
+        else:
+            encoder_out, encoder_out_lens = self.encoder(speech, speech_lengths)
         if isinstance(encoder_out, tuple):
             encoder_out = encoder_out[0]
+        timer.mark("encoder")
 
         # c. Passed the encoder result and the beam search
-        ctc_logits = self.ctc.log_softmax(encoder_out)
-        if kwargs.get("ban_emo_unk", False):
-            ctc_logits[:, :, self.emo_dict["unk"]] = -float("inf")
+        if frame_ids is None:
+            ctc_logits = self.ctc.log_softmax(encoder_out)
+            if kwargs.get("ban_emo_unk", False):
+                ctc_logits[:, :, self.emo_dict["unk"]] = -float("inf")
+            timer.mark("ctc_log_softmax")
 
         results = []
         b, n, d = encoder_out.size()
@@ -865,8 +1387,11 @@ class SenseVoiceSmall(nn.Module):
         if len(key) < b:
             key = key * b
         for i in range(b):
-            x = ctc_logits[i, : encoder_out_lens[i].item(), :]
-            yseq = x.argmax(dim=-1)
+            if frame_ids is None:
+                x = ctc_logits[i, : encoder_out_lens[i].item(), :]
+                yseq = x.argmax(dim=-1)
+            else:
+                yseq = frame_ids[i]
             yseq = torch.unique_consecutive(yseq, dim=-1)
 
             ibest_writer = None
@@ -877,31 +1402,37 @@ class SenseVoiceSmall(nn.Module):
 
             mask = yseq != self.blank_id
             token_int = yseq[mask].tolist()
+            timer.mark("greedy_decode")
 
             # Change integer-ids to tokens
             text = tokenizer.decode(token_int)
             if ibest_writer is not None:
                 ibest_writer["text"][key[i]] = text
+            timer.mark("detokenize")
 
             if output_timestamp:
                 from itertools import groupby
                 timestamp = []
                 tokens = tokenizer.text2tokens(text)[4:]
 
-                logits_speech = self.ctc.softmax(encoder_out)[i, 4:encoder_out_lens[i].item(), :]
+                if frame_ids is None:
+                    logits_speech = self.ctc.softmax(encoder_out)[i, 4:encoder_out_lens[i].item(), :]
 
-                pred = logits_speech.argmax(-1).cpu()
-                logits_speech[pred==self.blank_id, self.blank_id] = 0
+                    pred = logits_speech.argmax(-1).cpu()
+                    logits_speech[pred==self.blank_id, self.blank_id] = 0
 
-                align = ctc_forced_align(
-                    logits_speech.unsqueeze(0).float(),
-                    torch.Tensor(token_int[4:]).unsqueeze(0).long().to(logits_speech.device),
-                    (encoder_out_lens-4).long(),
-                    torch.tensor(len(token_int)-4).unsqueeze(0).long().to(logits_speech.device),
-                    ignore_id=self.ignore_id,
-                )
+                    align = ctc_forced_align(
+                        logits_speech.unsqueeze(0).float(),
+                        torch.Tensor(token_int[4:]).unsqueeze(0).long().to(logits_speech.device),
+                        (encoder_out_lens-4).long(),
+                        torch.tensor(len(token_int)-4).unsqueeze(0).long().to(logits_speech.device),
+                        ignore_id=self.ignore_id,
+                    )
+                else:
+                    # the stitched greedy path is its own alignment, no (frames, vocab) softmax needed
+                    align = frame_ids[i][None, 4:]
 
-                pred = groupby(align[0, :encoder_out_lens[0]])
+                pred = groupby(align[0, :encoder_out_lens[0]].tolist())
                 _start = 0
                 token_id = 0
                 ts_max = encoder_out_lens[i] - 4
@@ -913,14 +1444,134 @@ class SenseVoiceSmall(nn.Module):
                         timestamp.append([tokens[token_id], ts_left, ts_right])
                         token_id += 1
                     _start = _end
+                timer.mark("timestamp")
 
                 result_i = {"key": key[i], "text": text, "timestamp": timestamp}
                 results.append(result_i)
             else:
                 result_i = {"key": key[i], "text": text}
                 results.append(result_i)
+
+        # structured per-stage timings; the string fields above are kept for funasr
+        meta_data["stage_times"] = dict(timer.times)
+        audio_seconds = float((speech_lengths - 4).sum().item()) * 0.06
+        stage_stats.record(timer.times, audio_seconds, batch_size=b)
         return results, meta_data
 
+    def prompt_queries(self, language="auto", use_itn=False, text_norm=None, device=None):
+        """The 4 prompt query frames (language, event, emotion, text norm) as (1, 4, input_size)."""
+        if text_norm is None:
+            text_norm = "withitn" if use_itn else "woitn"
+        ids = [self.lid_dict.get(language, 0), 1, 2, self.textnorm_dict[text_norm]]
+        return self.embed(torch.LongTensor([ids]).to(device))
+
+    def inference_stream(
+        self,
+        data_in,
+        cache: dict,
+        is_final: bool = False,
+        key: str = "stream",
+        tokenizer=None,
+        frontend=None,
+        **kwargs,
+    ):
+        """Streaming recognition: feed audio chunk by chunk, get partial and final CTC hypotheses.
+
+        ``data_in`` is a chunk of 16 kHz mono float audio (numpy or tensor);
+        ``cache`` is the stream state, pass an empty dict for a new stream and
+        the same dict for every following chunk. Features come from
+        ``WavFrontendOnline`` and the encoder is stepped with
+        ``forward_chunk`` every ``chunk_size[1]`` LFR frames once
+        ``chunk_size[2]`` lookahead frames are there (60 ms each, default
+        (0, 6, 3): a first hypothesis after about 540 ms of audio).
+        ``look_back`` bounds the attention history in chunks, -1 keeps the
+        newest ``max_cache_frames``. The prompt queries are encoded with the
+        first chunk and stay in every layer's k/v cache. ``is_final``
+        flushes the remaining frames without lookahead and clears ``cache``.
+        """
+        if not cache:
+            self.init_stream(cache, frontend, **kwargs)
+        chunk_size = cache["chunk_size"]
+        timer = StageTimer()
+
+        waveform = data_in.cpu().numpy() if isinstance(data_in, torch.Tensor) else np.asarray(data_in)
+        waveform = waveform.astype(np.float32, copy=False).reshape(1, -1)
+        feats, _ = cache["frontend"].extract_fbank(waveform, np.array([waveform.shape[1]]), is_final)
+        if np.size(feats):
+            feats = torch.from_numpy(np.ascontiguousarray(feats[0])).to(cache["feats"].device)
+            cache["feats"] = torch.cat((cache["feats"], feats))
+        timer.mark("fbank_lfr_cmvn")
+
+        while True:
+            pending = cache["feats"].size(0)
+            if pending >= chunk_size[1] + chunk_size[2] and pending > chunk_size[2]:
+                step, lookahead = chunk_size[1], chunk_size[2]
+            elif is_final and pending:
+                step, lookahead = pending, 0
+            else:
+                break
+            xs = cache["feats"][None, : step + lookahead]
+            start_idx = 4 + cache["offset"]
+            if cache["encoder"] is None:
+                xs = torch.cat((cache["queries"], xs), dim=1)
+                start_idx = 0
+            encoder_out, cache["encoder"] = self.encoder.forward_chunk(
+                xs,
+                cache["encoder"],
+                (chunk_size[0], chunk_size[1], lookahead),
+                cache["look_back"],
+                start_idx,
+                max_cache_frames=cache["max_cache_frames"],
+                sink=4,  # the prompt queries stay visible to every chunk
+            )
+            logits = self.ctc.ctc_lo(encoder_out[0, : xs.size(1) - lookahead])
+            if kwargs.get("ban_emo_unk", False):
+                logits[:, self.emo_dict["unk"]] = -float("inf")
+            ids = logits.argmax(dim=-1).tolist()
+            if start_idx == 0:
+                cache["query_ids"], ids = ids[:4], ids[4:]
+            for token in ids:
+                if token != cache["last_id"] and token != self.blank_id:
+                    cache["token_int"].append(token)
+                cache["last_id"] = token
+            cache["feats"] = cache["feats"][step:]
+            cache["offset"] += step
+            timer.mark("encoder_ctc")
+
+        token_int = cache["query_ids"] + cache["token_int"]
+        text = tokenizer.decode(token_int) if tokenizer is not None and token_int else ""
+        result = {"key": key, "text": text, "is_final": is_final, "frames": cache["offset"]}
+        timer.mark("detokenize")
+        if is_final:
+            cache.clear()
+        return [result], {"stage_times": dict(timer.times)}
+
+    def init_stream(
+        self, cache: dict, frontend, chunk_size=(0, 6, 3), look_back=-1, max_cache_frames=1024, **kwargs
+    ):
+        """Fill an empty ``cache`` dict with the state of a new stream."""
+        try:
+            from .utils.frontend import WavFrontendOnline
+        except ImportError:
+            from utils.frontend import WavFrontendOnline
+
+        device = kwargs.get("device") or next(self.parameters()).device
+        # dither off, the same chunk always decodes the same way
+        cache["frontend"] = WavFrontendOnline.from_frontend(frontend, dither=0.0)
+        cache["chunk_size"] = tuple(chunk_size)
+        cache["look_back"] = look_back
+        cache["max_cache_frames"] = max_cache_frames
+        cache["queries"] = self.prompt_queries(
+            kwargs.get("language", "auto"), kwargs.get("use_itn", False), kwargs.get("text_norm"), device
+        )
+        cache["feats"] = torch.zeros(0, cache["queries"].size(-1), device=device)
+        cache["encoder"] = None
+        cache["offset"] = 0
+        cache["query_ids"] = []
+        cache["token_int"] = []
+        cache["last_id"] = None
+        return cache
+
     def export(self, **kwargs):
         from export_meta import export_rebuild_model
 
@@ -0,0 +1,107 @@
+# -*- encoding: utf-8 -*-
+import os
+from typing import List
+
+import numpy as np
+
+TARGET_FS = 16000
+
+
+def is_audio_item(item) -> bool:
+    """ComfyUI AUDIO: ``{"waveform": tensor, "sample_rate": fs}`` or the recorder's ``(waveform, fs)``."""
+    if isinstance(item, dict):
+        return "waveform" in item and "sample_rate" in item
+    return isinstance(item, (tuple, list)) and len(item) == 2 and isinstance(item[1], (int, np.integer))
+
+
+def _unpack_audio(item):
+    if isinstance(item, dict):
+        return item["waveform"], int(item["sample_rate"])
+    return item[0], int(item[1])
+
+
+def audio_to_waveform(item, target_fs: int = TARGET_FS) -> np.ndarray:
+    """Convert an AUDIO item to a mono float32 numpy waveform at ``target_fs``.
+
+    Accepts the layouts produced in this repo and by ComfyUI:
+    (1, C, T), (1, T, C), (C, T), (T, C) and (T,).
+    """
+    waveform, fs = _unpack_audio(item)
+    if hasattr(waveform, "detach"):
+        waveform = waveform.detach().cpu().numpy()
+    waveform = np.asarray(waveform)
+    if waveform.ndim == 3:
+        waveform = waveform[0]
+    if waveform.ndim == 2:
+        # channel axis is the short one
+        channel_axis = 0 if waveform.shape[0] <= waveform.shape[1] else 1
+        waveform = waveform.mean(axis=channel_axis)
+    if waveform.dtype == np.int16:
+        waveform = waveform.astype(np.float32) / 32768.0
+    waveform = waveform.astype(np.float32, copy=False)
+    if fs != target_fs:
+        waveform = resample(waveform, fs, target_fs)
+    return waveform
+
+
+def load_audio_file(path: str, target_fs: int = TARGET_FS) -> np.ndarray:
+    """Decode an audio file to a mono float32 waveform at ``target_fs``."""
+    import soundfile
+
+    waveform, fs = soundfile.read(path, dtype="float32", always_2d=True)
+    waveform = waveform.mean(axis=1) if waveform.shape[1] > 1 else waveform[:, 0]
+    if fs != target_fs:
+        waveform = resample(waveform, fs, target_fs)
+    return np.ascontiguousarray(waveform, dtype=np.float32)
+
+
+def resample(waveform: np.ndarray, orig_fs: int, target_fs: int) -> np.ndarray:
+    try:
+        import torch
+        import torchaudio
+    except ImportError:
+        from math import gcd
+        from scipy.signal import resample_poly
+
+        g = gcd(orig_fs, target_fs)
+        return resample_poly(waveform, target_fs // g, orig_fs // g).astype(np.float32)
+
+    tensor = torch.from_numpy(np.ascontiguousarray(waveform))
+    return torchaudio.functional.resample(tensor, orig_fs, target_fs).numpy()
+
+
+def audio_duration(item) -> float:
+    """Duration in seconds of a path or AUDIO item, without decoding the samples when possible."""
+    if isinstance(item, str):
+        try:
+            import soundfile
+
+            return float(soundfile.info(item).duration)
+        except Exception:
+            # unknown container: file size is still a usable ordering key
+            return os.path.getsize(item) / (TARGET_FS * 2)
+    if isinstance(item, np.ndarray):
+        return item.shape[-1] / TARGET_FS
+    waveform, fs = _unpack_audio(item)
+    length = max(waveform.shape[-2:]) if waveform.ndim >= 2 else waveform.shape[-1]
+    return length / fs
+
+
+def plan_batches(durations: List[float], batch_size_s: float) -> List[List[int]]:
+    """Group inputs into length-sorted buckets whose padded size stays within ``batch_size_s``.
+
+    Items are sorted by duration, so the padded cost of a bucket is
+    ``len(bucket) * duration of its last item``. An item longer than the budget
+    gets a bucket of its own.
+    """
+    order = sorted(range(len(durations)), key=lambda i: durations[i])
+    batches = []
+    current = []
+    for idx in order:
+        if current and (len(current) + 1) * durations[idx] > batch_size_s:
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,71 @@
+# -*- encoding: utf-8 -*-
+from typing import List, Optional, Sequence
+
+
+def padding_ratio(lengths: Sequence[int], batches: Optional[List[List[int]]] = None) -> float:
+    """Fraction of padded encoder frames for ``batches`` (default: one batch of everything)."""
+    if batches is None:
+        batches = [list(range(len(lengths)))]
+    valid = padded = 0
+    for batch in batches:
+        if not batch:
+            continue
+        longest = max(lengths[i] for i in batch)
+        valid += sum(lengths[i] for i in batch)
+        padded += longest * len(batch)
+    return 1.0 - valid / padded if padded else 0.0
+
+
+def packed_padding_ratio(lengths: Sequence[int], packs: List[List[int]], gap: int) -> float:
+    """Fraction of gap frames in packed sequences with ``gap`` frames between segments."""
+    valid = sum(lengths[i] for pack in packs for i in pack)
+    total = valid + sum(gap * (len(pack) - 1) for pack in packs if pack)
+    return 1.0 - valid / total if total else 0.0
+
+
+def plan_buckets(lengths: Sequence[int], max_frames: int, max_padding: float = 0.25) -> List[List[int]]:
+    """Length-sorted buckets of at most ``max_frames`` padded frames.
+
+    A bucket is also closed once adding the next (longer) segment would push
+    its padding ratio above ``max_padding``, so a handful of long segments
+    does not drag many short ones up to their length. An item longer than
+    the budget gets a bucket of its own.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    total = 0
+    for idx in order:
+        if current:
+            padded = (len(current) + 1) * lengths[idx]
+            if padded > max_frames or 1.0 - (total + lengths[idx]) / padded > max_padding:
+                batches.append(current)
+                current = []
+                total = 0
+        current.append(idx)
+        total += lengths[idx]
+    if current:
+        batches.append(current)
+    return batches
+
+
+def plan_packs(lengths: Sequence[int], max_frames: int, gap: int) -> List[List[int]]:
+    """First-fit decreasing packing of segments into sequences of at most ``max_frames``.
+
+    Segments in a pack are separated by ``gap`` frames; a segment longer than
+    the budget gets a pack of its own. Packs are returned longest segment
+    first, segments within a pack in packing order.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    packs = []
+    used = []
+    for idx in order:
+        for p, size in enumerate(used):
+            if size + gap + lengths[idx] <= max_frames:
+                packs[p].append(idx)
+                used[p] = size + gap + lengths[idx]
+                break
+        else:
+            packs.append([idx])
+            used.append(lengths[idx])
+    return packs
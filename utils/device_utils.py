@@ -0,0 +1,57 @@
+# -*- encoding: utf-8 -*-
+import os
+import threading
+
+_interop_lock = threading.Lock()
+_interop_threads = None
+_intra_threads = None
+
+
+def resolve_device(device: str) -> str:
+    """Fall back to cpu when a cuda device is requested but not available."""
+    import torch
+
+    if device.startswith("cuda") and not torch.cuda.is_available():
+        print(f"{device} 不可用，改用cpu推理")
+        return "cpu"
+    return device
+
+
+def default_cpu_threads() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return max(1, os.cpu_count() or 1)
+
+
+def configure_cpu_threads(num_threads: int = 0, interop_threads: int = 1, device: str = "cpu") -> int:
+    """Pin torch intra-op threads and (once per process) inter-op threads for cpu inference.
+
+    Both are process-wide torch settings: they change the thread count of
+    every other ComfyUI node that runs torch on the cpu, not only this one.
+    So nothing is set for a non-cpu ``device``, and intra-op threads are
+    only set again when the requested count differs from the one this
+    function set last; a value another node set in between is left alone.
+
+    VAD and ASR run one after another on the same thread, so a single
+    inter-op thread is enough and every core goes to intra-op work instead
+    of two pools competing for the same cores.
+    """
+    global _interop_threads, _intra_threads
+    num_threads = num_threads if num_threads > 0 else default_cpu_threads()
+    if not str(device).startswith("cpu"):
+        return num_threads
+
+    import torch
+
+    with _interop_lock:
+        if _intra_threads != num_threads:
+            torch.set_num_threads(num_threads)
+            _intra_threads = num_threads
+        if _interop_threads is None:
+            try:
+                torch.set_num_interop_threads(interop_threads)
+                _interop_threads = interop_threads
+            except RuntimeError:
+                # inter-op pool already started by someone else, keep its size
+                _interop_threads = torch.get_num_interop_threads()
+    return num_threads
@@ -0,0 +1,173 @@
+# -*- encoding: utf-8 -*-
+"""Vectorized Kaldi-compatible log-mel filterbank.
+
+Reproduces ``kaldi_native_fbank.OnlineFbank`` (snip_edges=True, use_energy=False,
+power spectrum, log mel) for a whole buffer in one call: frames are strided
+views of the input, and windowing, FFT and mel projection run on blocks of
+frames instead of one ``get_frame`` call per frame.
+
+Output is not bit-exact with knf, the FFT and mel projection round
+differently in float32. On 0.1-rms white noise the max abs diff on
+log-mel is about 1.5e-4 for 10 s and 4.2e-3 for 600 s. The worst values
+sit in low-energy bins (log-mel around 1), where a float32 rounding of
+the small mel power becomes a visible log difference. The 99.99th
+percentile stays under 1e-4. ``benchmarks/bench_fbank.py`` checks a
+1e-2 bound.
+"""
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+FLOAT_EPSILON = np.finfo(np.float32).eps
+
+
+def next_power_of_2(n: int) -> int:
+    return 1 << (int(n) - 1).bit_length()
+
+
+def mel_scale(freq):
+    return 1127.0 * np.log(1.0 + np.asarray(freq, dtype=np.float64) / 700.0)
+
+
+def feature_window(window_type: str, size: int, blackman_coeff: float = 0.42) -> np.ndarray:
+    a = 2 * np.pi / (size - 1)
+    i = np.arange(size, dtype=np.float64)
+    if window_type == "hanning":
+        window = 0.5 - 0.5 * np.cos(a * i)
+    elif window_type == "sine":
+        window = np.sin(0.5 * a * i)
+    elif window_type == "hamming":
+        window = 0.54 - 0.46 * np.cos(a * i)
+    elif window_type == "povey":
+        window = np.power(0.5 - 0.5 * np.cos(a * i), 0.85)
+    elif window_type == "rectangular":
+        window = np.ones(size, dtype=np.float64)
+    elif window_type == "blackman":
+        window = blackman_coeff - 0.5 * np.cos(a * i) + (0.5 - blackman_coeff) * np.cos(2 * a * i)
+    else:
+        raise ValueError(f"unsupported window type: {window_type}")
+    return window.astype(np.float32)
+
+
+def mel_banks(
+    n_mels: int, padded_window_size: int, fs: float, low_freq: float = 20.0, high_freq: float = 0.0
+) -> np.ndarray:
+    """Triangular mel filters as a ``(padded_window_size // 2 + 1, n_mels)`` float32 matrix."""
+    num_fft_bins = padded_window_size // 2
+    nyquist = 0.5 * fs
+    if high_freq <= 0.0:
+        high_freq = nyquist + high_freq
+    fft_bin_width = fs / padded_window_size
+    mel_low = mel_scale(low_freq)
+    mel_high = mel_scale(high_freq)
+    mel_delta = (mel_high - mel_low) / (n_mels + 1)
+
+    mel = mel_scale(fft_bin_width * np.arange(num_fft_bins))[:, None]
+    left = mel_low + np.arange(n_mels)[None, :] * mel_delta
+    center = left + mel_delta
+    right = center + mel_delta
+    up = (mel - left) / (center - left)
+    down = (right - mel) / (right - center)
+    weights = np.where(mel <= center, up, down)
+    weights = np.where((mel > left) & (mel < right), weights, 0.0)
+
+    banks = np.zeros((num_fft_bins + 1, n_mels), dtype=np.float32)
+    banks[:num_fft_bins] = weights
+    return banks
+
+
+class FbankComputer:
+    """Stateless bulk fbank: ``(samples,)`` float32/int16 -> ``(frames, n_mels)`` float32.
+
+    Memory stays bounded for long inputs because frames are processed in
+    blocks of ``block_frames``; only the output matrix scales with duration.
+    """
+
+    def __init__(
+        self,
+        fs: int = 16000,
+        n_mels: int = 80,
+        frame_length: float = 25,
+        frame_shift: float = 10,
+        window: str = "hamming",
+        dither: float = 0.0,
+        preemph_coeff: float = 0.97,
+        remove_dc_offset: bool = True,
+        low_freq: float = 20.0,
+        high_freq: float = 0.0,
+        block_frames: int = 2048,
+    ):
+        self.fs = fs
+        self.n_mels = n_mels
+        self.dither = dither
+        self.preemph_coeff = preemph_coeff
+        self.remove_dc_offset = remove_dc_offset
+        self.block_frames = block_frames
+        self.frame_length = int(fs * 0.001 * frame_length)
+        self.frame_shift = int(fs * 0.001 * frame_shift)
+        self.padded_length = next_power_of_2(self.frame_length)
+        self.window = feature_window(window, self.frame_length)
+        self.mel_banks = mel_banks(n_mels, self.padded_length, fs, low_freq, high_freq)
+
+    def num_frames(self, num_samples: int) -> int:
+        if num_samples < self.frame_length:
+            return 0
+        return 1 + (num_samples - self.frame_length) // self.frame_shift
+
+    def frames(self, waveform: np.ndarray) -> np.ndarray:
+        """Zero-copy ``(frames, frame_length)`` view over a 1-d waveform."""
+        waveform = np.ascontiguousarray(waveform)
+        n = self.num_frames(waveform.shape[0])
+        step = waveform.strides[0]
+        return as_strided(
+            waveform, shape=(n, self.frame_length), strides=(self.frame_shift * step, step), writeable=False
+        )
+
+    def __call__(
+        self,
+        waveform: np.ndarray,
+        scale: float = 1.0,
+        rng: Optional[np.random.Generator] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Compute fbank for a whole waveform.
+
+        ``scale`` is applied per block (e.g. ``1 << 15`` for float audio in
+        [-1, 1]); int16 input is used as is. ``rng`` drives dither, so a fixed
+        seed gives reproducible features.
+        """
+        return self.compute_frames(self.frames(waveform), scale=scale, rng=rng, out=out)
+
+    def compute_frames(
+        self,
+        frames: np.ndarray,
+        scale: float = 1.0,
+        rng: Optional[np.random.Generator] = None,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        num_frames = frames.shape[0]
+        if out is None:
+            out = np.empty((num_frames, self.n_mels), dtype=np.float32)
+        if self.dither != 0.0 and rng is None:
+            rng = np.random.default_rng()
+        for beg in range(0, num_frames, self.block_frames):
+            end = min(num_frames, beg + self.block_frames)
+            x = frames[beg:end].astype(np.float32)
+            if scale != 1.0:
+                x *= np.float32(scale)
+            if self.dither != 0.0:
+                x += np.float32(self.dither) * rng.standard_normal(x.shape, dtype=np.float32)
+            if self.remove_dc_offset:
+                x -= x.mean(axis=1, keepdims=True)
+            if self.preemph_coeff != 0.0:
+                x[:, 1:] -= np.float32(self.preemph_coeff) * x[:, :-1]
+                x[:, 0] *= np.float32(1.0 - self.preemph_coeff)
+            x *= self.window
+            spectrum = np.fft.rfft(x, n=self.padded_length, axis=1)
+            power = np.square(spectrum.real, dtype=np.float32)
+            power += np.square(spectrum.imag, dtype=np.float32)
+            mel = np.matmul(power, self.mel_banks, out=out[beg:end])
+            np.maximum(mel, FLOAT_EPSILON, out=mel)
+            np.log(mel, out=mel)
+        return out
@@ -0,0 +1,253 @@
+# -*- encoding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from .audio_utils import load_audio_file
+from .frontend import frontend_conf
+from .result_cache import audio_digest
+
+INDEX_NAME = "index.json"
+CONFIG_NAME = "config.json"
+
+
+def frontend_config(frontend, dtype) -> dict:
+    """Everything that changes the features of a ``utils.frontend.WavFrontend``."""
+    conf = frontend_conf(frontend)
+    cmvn = conf["cmvn"]
+    if cmvn is not None:
+        cmvn = hashlib.sha256(np.ascontiguousarray(cmvn, dtype=np.float32)).hexdigest()[:16]
+    return {
+        "fs": float(conf["fs"]),
+        "window": conf["window"],
+        "n_mels": conf["n_mels"],
+        "frame_length": conf["frame_length"],
+        "frame_shift": conf["frame_shift"],
+        "lfr_m": conf["lfr_m"],
+        "lfr_n": conf["lfr_n"],
+        "cmvn": cmvn,
+        "dither": float(conf["dither"]),
+        "dtype": np.dtype(dtype).name,
+    }
+
+
+def dither_seed(digest: str) -> int:
+    """Dither noise is seeded from the audio hash, so a clip always gets the same features."""
+    return int(digest[:16], 16)
+
+
+class FeatureStore:
+    """Sharded, memory-mapped store of LFR+CMVN features.
+
+    Each frontend config (incl. dither and storage dtype) gets its own
+    directory ``store_dir/<config hash>/`` with append-only ``shard-*.bin``
+    files and an ``index.json`` mapping audio sha256 -> (shard, offset,
+    frames). ``get`` returns zero-copy slices of the shard memmaps.
+
+    Dither stays deterministic: the rng is seeded from the audio hash, so a
+    cached entry is exactly what recomputing it would give. One writer per
+    directory; the index is rewritten atomically on ``flush``.
+    """
+
+    def __init__(self, store_dir: str, frontend, dtype=np.float32, shard_bytes: int = 256 << 20):
+        self.dtype = np.dtype(dtype)
+        if self.dtype not in (np.dtype(np.float32), np.dtype(np.float16)):
+            raise ValueError(f"feature store supports float32 or float16, got {self.dtype}")
+        self.frontend = frontend
+        self.shard_bytes = shard_bytes
+        self.dim = frontend.fbank_computer.n_mels * frontend.lfr_m
+        self.config = frontend_config(frontend, self.dtype)
+        config_key = hashlib.sha256(json.dumps(self.config, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.store_dir = os.path.join(store_dir, config_key)
+        os.makedirs(self.store_dir, exist_ok=True)
+        config_path = os.path.join(self.store_dir, CONFIG_NAME)
+        if not os.path.isfile(config_path):
+            with open(config_path, "w", encoding="utf-8") as f:
+                json.dump(self.config, f, indent=1)
+
+        self._lock = threading.RLock()
+        self._digests = {}
+        self._maps = {}
+        self._writer = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    # index --------------------------------------------------------------
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.store_dir, f"shard-{shard:05d}.bin")
+
+    def _load_index(self):
+        self.shards = 0
+        self.entries = {}
+        path = os.path.join(self.store_dir, INDEX_NAME)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.shards = index.get("shards", 0)
+        sizes = {}
+        for key, (shard, offset, frames) in index.get("entries", {}).items():
+            if shard not in sizes:
+                try:
+                    sizes[shard] = os.path.getsize(self._shard_path(shard))
+                except OSError:
+                    sizes[shard] = 0
+            # entries past the end of a truncated shard are dropped
+            if (offset + frames * self.dim) * self.dtype.itemsize <= sizes[shard]:
+                self.entries[key] = (shard, offset, frames)
+
+    def flush(self):
+        with self._lock:
+            if self._writer is not None:
+                self._writer.flush()
+            if not self._dirty:
+                return
+            index = {"shards": self.shards, "entries": self.entries}
+            tmp_path = os.path.join(self.store_dir, INDEX_NAME + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, os.path.join(self.store_dir, INDEX_NAME))
+            self._dirty = False
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+            self._maps.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # read / write -------------------------------------------------------
+    def key(self, audio) -> str:
+        return audio_digest(audio, self._digests)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str):
+        """Features for an audio sha256 as a read-only memmap slice, or None."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            shard, offset, frames = entry
+            end = offset + frames * self.dim
+            mm = self._maps.get(shard)
+            if mm is None or mm.shape[0] < end:
+                # shards are append-only, remap when the entry lies past the old mapping
+                if self._writer is not None and shard == self.shards - 1:
+                    self._writer.flush()
+                mm = self._maps[shard] = np.memmap(self._shard_path(shard), dtype=self.dtype, mode="r")
+            return mm[offset:end].reshape(frames, self.dim)
+
+    def put(self, key: str, feats: np.ndarray):
+        feats = np.ascontiguousarray(feats, dtype=self.dtype)
+        if feats.ndim != 2 or feats.shape[1] != self.dim:
+            raise ValueError(f"expected (frames, {self.dim}) features, got {feats.shape}")
+        with self._lock:
+            if key in self.entries:
+                return
+            if self._writer is None and self.shards:
+                # keep appending to the last shard of a previous run
+                self._writer = open(self._shard_path(self.shards - 1), "ab")
+            if self._writer is not None:
+                size = self._writer.tell()
+                if size and size + feats.nbytes > self.shard_bytes:
+                    self._writer.close()
+                    self._writer = None
+            if self._writer is None:
+                self._writer = open(self._shard_path(self.shards), "ab")
+                self.shards += 1
+            offset = self._writer.tell() // self.dtype.itemsize
+            self._writer.write(memoryview(feats).cast("B"))
+            self.entries[key] = (self.shards - 1, offset, feats.shape[0])
+            self._dirty = True
+
+    def compute(self, audio, key: str = None) -> np.ndarray:
+        """fbank + LFR + CMVN for a path or a 16 kHz float32 waveform, dither seeded from its hash."""
+        if key is None:
+            key = self.key(audio)
+        waveform = load_audio_file(audio) if isinstance(audio, str) else audio
+        rng = np.random.default_rng(dither_seed(key))
+        feat, _ = self.frontend.fbank(waveform, rng=rng)
+        feat, _ = self.frontend.lfr_cmvn(feat)
+        return feat
+
+    def features(self, audio) -> np.ndarray:
+        """Cached features for ``audio``; computed and stored on the first request."""
+        key = self.key(audio)
+        feats = self.get(key)
+        if feats is None:
+            self.put(key, self.compute(audio, key))
+            feats = self.get(key)
+        return feats
+
+    def populate(self, items, flush_every: int = 256) -> dict:
+        """Compute and store features for every item not in the store yet."""
+        added = skipped = 0
+        for i, item in enumerate(items):
+            key = self.key(item)
+            if key in self.entries:
+                skipped += 1
+                continue
+            self.put(key, self.compute(item, key))
+            added += 1
+            if added % flush_every == 0:
+                self.flush()
+        self.flush()
+        return {"added": added, "skipped": skipped}
+
+    def populate_manifest(self, manifest_path: str, field: str = "source", **kwargs) -> dict:
+        """Populate from a jsonl manifest such as ``data/train_example.jsonl``."""
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            sources = [json.loads(line)[field] for line in f if line.strip()]
+        return self.populate(sources, **kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            frames = sum(entry[2] for entry in self.entries.values())
+            return {
+                "entries": len(self.entries),
+                "shards": self.shards,
+                "bytes": frames * self.dim * self.dtype.itemsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from .frontend import WavFrontend
+
+    parser = argparse.ArgumentParser(description="precompute SenseVoice features for a jsonl manifest")
+    parser.add_argument("manifest")
+    parser.add_argument("store_dir")
+    parser.add_argument("--cmvn", required=True, help="am.mvn of the model")
+    parser.add_argument("--dither", type=float, default=0.0)
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"])
+    args = parser.parse_args()
+
+    with FeatureStore(
+        args.store_dir,
+        WavFrontend(cmvn_file=args.cmvn, lfr_m=7, lfr_n=6, dither=args.dither),
+        dtype=args.dtype,
+    ) as store:
+        print(store.populate_manifest(args.manifest))
+        print(store.stats())
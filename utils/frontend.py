@@ -2,14 +2,157 @@
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, NamedTuple, Set, Tuple, Union
 import copy
+import os
+import threading
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 import kaldi_native_fbank as knf
 
+from .fbank import FbankComputer
+
 root_dir = Path(__file__).resolve().parent
 
 logger_initialized = {}
 
+_cmvn_cache = {}
+_cmvn_lock = threading.Lock()
+
+
+def parse_cmvn(cmvn_file: str) -> np.ndarray:
+    """Parse the <AddShift>/<Rescale> rows of a kaldi nnet ``am.mvn`` into a (2, dim) array."""
+    with open(cmvn_file, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+
+    means_list = []
+    vars_list = []
+    for i in range(len(lines)):
+        line_item = lines[i].split()
+        if line_item[0] == "<AddShift>":
+            line_item = lines[i + 1].split()
+            if line_item[0] == "<LearnRateCoef>":
+                add_shift_line = line_item[3 : (len(line_item) - 1)]
+                means_list = list(add_shift_line)
+                continue
+        elif line_item[0] == "<Rescale>":
+            line_item = lines[i + 1].split()
+            if line_item[0] == "<LearnRateCoef>":
+                rescale_line = line_item[3 : (len(line_item) - 1)]
+                vars_list = list(rescale_line)
+                continue
+
+    means = np.array(means_list).astype(np.float64)
+    vars = np.array(vars_list).astype(np.float64)
+    cmvn = np.array([means, vars])
+    return cmvn
+
+
+def load_cmvn_cached(cmvn_file: str) -> np.ndarray:
+    """CMVN stats as a shared read-only float32 array, parsed once per file version.
+
+    Keyed by (path, mtime, size), so every frontend instance in the process
+    shares one copy and an edited ``am.mvn`` is picked up again.
+    """
+    path = os.path.realpath(cmvn_file)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    cmvn = _cmvn_cache.get(key)
+    if cmvn is None:
+        with _cmvn_lock:
+            cmvn = _cmvn_cache.get(key)
+            if cmvn is None:
+                cmvn = parse_cmvn(path).astype(np.float32)
+                cmvn.flags.writeable = False
+                for old_key in [k for k in _cmvn_cache if k[0] == path]:
+                    del _cmvn_cache[old_key]
+                _cmvn_cache[key] = cmvn
+    return cmvn
+
+
+def stack_lfr(
+    inputs: np.ndarray, lfr_m: int, lfr_n: int, num_frames: int, left_padding: int = 0
+) -> np.ndarray:
+    """Stack ``lfr_m`` frames every ``lfr_n`` frames into ``(num_frames, lfr_m * dim)`` float32.
+
+    ``left_padding`` copies of the first frame are put in front, and the last
+    frame is repeated as often as the final window needs. Windows are read
+    from a strided view, so the only copy is the output matrix itself.
+    """
+    T, dim = inputs.shape
+    if num_frames <= 0:
+        return np.empty((0, lfr_m * dim), dtype=np.float32)
+    right_padding = max(0, (num_frames - 1) * lfr_n + lfr_m - (T + left_padding))
+    if left_padding or right_padding:
+        inputs = np.concatenate(
+            (
+                np.repeat(inputs[:1], left_padding, axis=0),
+                inputs,
+                np.repeat(inputs[-1:], right_padding, axis=0),
+            )
+        )
+    inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+    row_stride, item_stride = inputs.strides
+    windows = as_strided(
+        inputs,
+        shape=(num_frames, lfr_m * dim),
+        strides=(lfr_n * row_stride, item_stride),
+        writeable=False,
+    )
+    return windows.copy()
+
+
+class StreamBuffer:
+    """FIFO over a preallocated array whose content is always one contiguous view.
+
+    ``append`` copies into the free tail and ``consume``/``truncate`` only move
+    indices. When the tail runs out, the live rows (bounded by the frame or
+    LFR context) are moved to the front; the array only grows when the live
+    rows plus the new chunk exceed the capacity, so a stream with a steady
+    chunk size stops allocating after its first chunks.
+    """
+
+    def __init__(self, capacity: int, row_shape: Tuple[int, ...] = (), dtype=np.float32):
+        self.data = np.empty((max(1, capacity),) + tuple(row_shape), dtype=dtype)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[0]
+
+    def view(self) -> np.ndarray:
+        return self.data[self.start : self.end]
+
+    def append(self, rows: np.ndarray):
+        n = rows.shape[0]
+        if self.end + n > self.capacity:
+            live = len(self)
+            if live + n > self.capacity:
+                data = np.empty((max(2 * self.capacity, live + n),) + self.data.shape[1:], self.data.dtype)
+                data[:live] = self.view()
+                self.data = data
+            else:
+                self.data[:live] = self.view()
+            self.start, self.end = 0, live
+        self.data[self.end : self.end + n] = rows
+        self.end += n
+
+    def consume(self, n: int):
+        """Drop ``n`` rows from the front."""
+        self.start = min(self.end, self.start + max(0, n))
+        if self.start == self.end:
+            self.start = self.end = 0
+
+    def truncate(self, n: int):
+        """Keep only the first ``n`` rows."""
+        self.end = self.start + min(len(self), max(0, n))
+
+    def clear(self):
+        self.start = self.end = 0
+
 
 class WavFrontend:
     """Conventional frontend structure for ASR."""
@@ -39,6 +182,14 @@ class WavFrontend:
         opts.frame_opts.snip_edges = True
         opts.mel_opts.debug_mel = False
         self.opts = opts
+        self.fbank_computer = FbankComputer(
+            fs=fs,
+            n_mels=n_mels,
+            frame_length=frame_length,
+            frame_shift=frame_shift,
+            window=window,
+            dither=dither,
+        )
 
         self.lfr_m = lfr_m
         self.lfr_n = lfr_n
@@ -46,115 +197,138 @@ class WavFrontend:
 
         if self.cmvn_file:
             self.cmvn = self.load_cmvn()
-        self.fbank_fn = None
-        self.fbank_beg_idx = 0
         self.reset_status()
 
-    def fbank(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
-        self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
-        frames = self.fbank_fn.num_frames_ready
-        mat = np.empty([frames, self.opts.mel_opts.num_bins])
-        for i in range(frames):
-            mat[i, :] = self.fbank_fn.get_frame(i)
-        feat = mat.astype(np.float32)
-        feat_len = np.array(mat.shape[0]).astype(np.int32)
+    @staticmethod
+    def _pcm_scale(waveform: np.ndarray) -> float:
+        # float audio is in [-1, 1], int16 pcm is already on the kaldi scale
+        return 1.0 if waveform.dtype == np.int16 else float(1 << 15)
+
+    def fbank(self, waveform: np.ndarray, rng: np.random.Generator = None) -> Tuple[np.ndarray, np.ndarray]:
+        # a seeded rng makes the dither (and so the features) reproducible
+        feat = self.fbank_computer(waveform, scale=self._pcm_scale(waveform), rng=rng)
+        feat_len = np.array(feat.shape[0]).astype(np.int32)
         return feat, feat_len
 
+    def fbank_pcm16(self, data) -> Tuple[np.ndarray, np.ndarray]:
+        """fbank straight from raw int16 PCM (bytes, memoryview, mmap or int16 array).
+
+        The samples are never converted as a whole: ``pcm16_view`` wraps the
+        buffer without copying, frames are strided views over it, and the only
+        copies left are one float32 block of frames at a time inside
+        ``FbankComputer`` and the returned feature matrix.
+
+        This is a library entry point for callers that hold raw PCM (e.g. a
+        socket or a wav file's data chunk); the ComfyUI nodes pass AUDIO
+        tensors to funasr and do not use it.
+        """
+        return self.fbank(pcm16_view(data))
+
     def fbank_online(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
-        # self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
-        frames = self.fbank_fn.num_frames_ready
-        mat = np.empty([frames, self.opts.mel_opts.num_bins])
-        for i in range(self.fbank_beg_idx, frames):
-            mat[i, :] = self.fbank_fn.get_frame(i)
-        # self.fbank_beg_idx += (frames-self.fbank_beg_idx)
-        feat = mat.astype(np.float32)
-        feat_len = np.array(mat.shape[0]).astype(np.int32)
+        # samples that did not fill a whole frame yet are kept for the next call,
+        # the returned matrix holds every frame since the last reset_status()
+        waveform = np.asarray(waveform, dtype=np.float32) * np.float32(self._pcm_scale(waveform))
+        if self.fbank_tail.shape[0]:
+            waveform = np.concatenate((self.fbank_tail, waveform))
+        frames = self.fbank_computer.num_frames(waveform.shape[0])
+        if frames:
+            self.fbank_feats.append(self.fbank_computer(waveform))
+        self.fbank_tail = waveform[frames * self.fbank_computer.frame_shift :]
+        if len(self.fbank_feats) > 1:
+            self.fbank_feats = [np.concatenate(self.fbank_feats)]
+        feat = (
+            self.fbank_feats[0]
+            if self.fbank_feats
+            else np.empty((0, self.fbank_computer.n_mels), dtype=np.float32)
+        )
+        feat_len = np.array(feat.shape[0]).astype(np.int32)
         return feat, feat_len
 
     def reset_status(self):
-        self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_beg_idx = 0
+        self.fbank_tail = np.empty(0, dtype=np.float32)
+        self.fbank_feats = []
 
     def lfr_cmvn(self, feat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        stacked = False
         if self.lfr_m != 1 or self.lfr_n != 1:
             feat = self.apply_lfr(feat, self.lfr_m, self.lfr_n)
+            stacked = True
 
         if self.cmvn_file:
-            feat = self.apply_cmvn(feat)
+            # the LFR output is a fresh matrix, so it can be normalized in place
+            feat = self.apply_cmvn(feat, inplace=stacked)
 
         feat_len = np.array(feat.shape[0]).astype(np.int32)
         return feat, feat_len
 
     @staticmethod
     def apply_lfr(inputs: np.ndarray, lfr_m: int, lfr_n: int) -> np.ndarray:
-        LFR_inputs = []
-
         T = inputs.shape[0]
         T_lfr = int(np.ceil(T / lfr_n))
-        left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
-        inputs = np.vstack((left_padding, inputs))
-        T = T + (lfr_m - 1) // 2
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
-            else:
-                # process last LFR frame
-                num_padding = lfr_m - (T - i * lfr_n)
-                frame = inputs[i * lfr_n :].reshape(-1)
-                for _ in range(num_padding):
-                    frame = np.hstack((frame, inputs[-1]))
+        return stack_lfr(inputs, lfr_m, lfr_n, T_lfr, left_padding=(lfr_m - 1) // 2)
 
-                LFR_inputs.append(frame)
-        LFR_outputs = np.vstack(LFR_inputs).astype(np.float32)
-        return LFR_outputs
-
-    def apply_cmvn(self, inputs: np.ndarray) -> np.ndarray:
+    def apply_cmvn(self, inputs: np.ndarray, inplace: bool = False) -> np.ndarray:
         """
         Apply CMVN with mvn data
+
+        The stats are broadcast over the frames; with ``inplace=True`` a float32
+        ``inputs`` is overwritten instead of allocating a new matrix.
         """
-        frame, dim = inputs.shape
-        means = np.tile(self.cmvn[0:1, :dim], (frame, 1))
-        vars = np.tile(self.cmvn[1:2, :dim], (frame, 1))
-        inputs = (inputs + means) * vars
+        dim = inputs.shape[1]
+        if not inplace or inputs.dtype != np.float32 or not inputs.flags.writeable:
+            inputs = inputs.astype(np.float32)
+        inputs += self.cmvn[0, :dim]
+        inputs *= self.cmvn[1, :dim]
         return inputs
 
     def load_cmvn(
         self,
     ) -> np.ndarray:
-        with open(self.cmvn_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-
-        means_list = []
-        vars_list = []
-        for i in range(len(lines)):
-            line_item = lines[i].split()
-            if line_item[0] == "<AddShift>":
-                line_item = lines[i + 1].split()
-                if line_item[0] == "<LearnRateCoef>":
-                    add_shift_line = line_item[3 : (len(line_item) - 1)]
-                    means_list = list(add_shift_line)
-                    continue
-            elif line_item[0] == "<Rescale>":
-                line_item = lines[i + 1].split()
-                if line_item[0] == "<LearnRateCoef>":
-                    rescale_line = line_item[3 : (len(line_item) - 1)]
-                    vars_list = list(rescale_line)
-                    continue
-
-        means = np.array(means_list).astype(np.float64)
-        vars = np.array(vars_list).astype(np.float64)
-        cmvn = np.array([means, vars])
-        return cmvn
+        return load_cmvn_cached(self.cmvn_file)
+
+
+def frontend_conf(frontend) -> Dict[str, Any]:
+    """Feature settings of a ``WavFrontend`` from this module or from funasr.
+
+    Keys follow the ``WavFrontend`` arguments (``fs``, ``window``, ``n_mels``,
+    ``frame_length``, ``frame_shift``, ``dither``, ``lfr_m``, ``lfr_n``,
+    ``cmvn_file``) plus ``upsacle_samples`` and ``cmvn``, the loaded stats or
+    None without a cmvn file.
+    """
+    computer = getattr(frontend, "fbank_computer", None)
+    if computer is not None:
+        opts = frontend.opts.frame_opts
+        conf = dict(
+            fs=computer.fs,
+            window=opts.window_type,
+            n_mels=computer.n_mels,
+            frame_length=opts.frame_length_ms,
+            frame_shift=opts.frame_shift_ms,
+            dither=opts.dither,
+            upsacle_samples=True,
+        )
+    else:
+        conf = dict(
+            fs=frontend.fs,
+            window=frontend.window,
+            n_mels=frontend.n_mels,
+            frame_length=frontend.frame_length,
+            frame_shift=frontend.frame_shift,
+            dither=frontend.dither,
+            upsacle_samples=getattr(frontend, "upsacle_samples", True),
+        )
+    conf.update(
+        lfr_m=frontend.lfr_m,
+        lfr_n=frontend.lfr_n,
+        cmvn_file=frontend.cmvn_file,
+        cmvn=frontend.cmvn if frontend.cmvn_file else None,
+    )
+    return conf
 
 
 class WavFrontendOnline(WavFrontend):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # self.fbank_fn = knf.OnlineFbank(self.opts)
         # add variables
         self.frame_sample_length = int(
             self.opts.frame_opts.frame_length_ms * self.opts.frame_opts.samp_freq / 1000
@@ -162,10 +336,26 @@ class WavFrontendOnline(WavFrontend):
         self.frame_shift_sample_length = int(
             self.opts.frame_opts.frame_shift_ms * self.opts.frame_opts.samp_freq / 1000
         )
-        self.waveform = None
-        self.reserve_waveforms = None
+        # stream state lives in preallocated buffers that are reused chunk after chunk:
+        # unconsumed samples (< one frame + a chunk), the waveform kept for the
+        # LFR context and the LFR splice cache (< lfr_m frames + a chunk)
         self.input_cache = None
-        self.lfr_splice_cache = []
+        self.waveform_buffer = StreamBuffer(self.frame_sample_length * max(self.lfr_m, 1) + 16000)
+        self.lfr_splice_cache = StreamBuffer(
+            2 * max(self.lfr_m, 1) + 64, (self.fbank_computer.n_mels,)
+        )
+        self.waveforms = None
+        self.reserve_waveforms = None
+        self.splice_ready = False
+
+    @classmethod
+    def from_frontend(cls, frontend, **kwargs) -> "WavFrontendOnline":
+        """Online frontend with the config of ``utils.frontend.WavFrontend`` or funasr's ``WavFrontend``."""
+        conf = frontend_conf(frontend)
+        for name in ("upsacle_samples", "cmvn"):
+            conf.pop(name)
+        conf.update(kwargs)
+        return cls(**conf)
 
     @staticmethod
     # inputs has catted the cache
@@ -176,30 +366,20 @@ class WavFrontendOnline(WavFrontend):
         Apply lfr with data
         """
 
-        LFR_inputs = []
         T = inputs.shape[0]  # include the right context
         T_lfr = int(
             np.ceil((T - (lfr_m - 1) // 2) / lfr_n)
         )  # minus the right context: (lfr_m - 1) // 2
         splice_idx = T_lfr
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
-            else:  # process last LFR frame
-                if is_final:
-                    num_padding = lfr_m - (T - i * lfr_n)
-                    frame = (inputs[i * lfr_n :]).reshape(-1)
-                    for _ in range(num_padding):
-                        frame = np.hstack((frame, inputs[-1]))
-                    LFR_inputs.append(frame)
-                else:
-                    # update splice_idx and break the circle
-                    splice_idx = i
-                    break
+        if not is_final:
+            # only windows that are complete can be emitted, the rest waits in the splice cache
+            num_full = (T - lfr_m) // lfr_n + 1 if T >= lfr_m else 0
+            if num_full < T_lfr:
+                splice_idx = T_lfr = num_full
+        LFR_outputs = stack_lfr(inputs, lfr_m, lfr_n, T_lfr)
         splice_idx = min(T - 1, splice_idx * lfr_n)
         lfr_splice_cache = inputs[splice_idx:, :]
-        LFR_outputs = np.vstack(LFR_inputs)
-        return LFR_outputs.astype(np.float32), lfr_splice_cache, splice_idx
+        return LFR_outputs, lfr_splice_cache, splice_idx
 
     @staticmethod
     def compute_frame_num(
@@ -211,50 +391,41 @@ class WavFrontendOnline(WavFrontend):
     def fbank(
         self, input: np.ndarray, input_lengths: np.ndarray
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        self.fbank_fn = knf.OnlineFbank(self.opts)
+        """Fbank of every complete frame in cache + ``input``.
+
+        The returned waveforms view the stream buffer and stay valid until the next call.
+        """
         batch_size = input.shape[0]
         if self.input_cache is None:
-            self.input_cache = np.empty((batch_size, 0), dtype=np.float32)
-        input = np.concatenate((self.input_cache, input), axis=1)
+            self.input_cache = [
+                StreamBuffer(self.frame_sample_length + input.shape[1]) for _ in range(batch_size)
+            ]
+        for i in range(batch_size):
+            self.input_cache[i].append(input[i])
         frame_num = self.compute_frame_num(
-            input.shape[-1], self.frame_sample_length, self.frame_shift_sample_length
+            len(self.input_cache[0]), self.frame_sample_length, self.frame_shift_sample_length
         )
-        # update self.in_cache
-        self.input_cache = input[
-            :, -(input.shape[-1] - frame_num * self.frame_shift_sample_length) :
-        ]
         waveforms = np.empty(0, dtype=np.float32)
         feats_pad = np.empty(0, dtype=np.float32)
         feats_lens = np.empty(0, dtype=np.int32)
         if frame_num:
+            sample_length = (frame_num - 1) * self.frame_shift_sample_length + self.frame_sample_length
             waveforms = []
             feats = []
             feats_lens = []
             for i in range(batch_size):
-                waveform = input[i]
-                waveforms.append(
-                    waveform[
-                        : (
-                            (frame_num - 1) * self.frame_shift_sample_length
-                            + self.frame_sample_length
-                        )
-                    ]
-                )
-                waveform = waveform * (1 << 15)
-
-                self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
-                frames = self.fbank_fn.num_frames_ready
-                mat = np.empty([frames, self.opts.mel_opts.num_bins])
-                for i in range(frames):
-                    mat[i, :] = self.fbank_fn.get_frame(i)
-                feat = mat.astype(np.float32)
-                feat_len = np.array(mat.shape[0]).astype(np.int32)
+                waveform = self.input_cache[i].view()[:sample_length]
+                waveforms.append(waveform)
+                feat = self.fbank_computer(waveform, scale=1 << 15)
                 feats.append(feat)
-                feats_lens.append(feat_len)
+                feats_lens.append(feat.shape[0])
 
-            waveforms = np.stack(waveforms)
+            waveforms = waveforms[0][np.newaxis] if batch_size == 1 else np.stack(waveforms)
             feats_lens = np.array(feats_lens)
-            feats_pad = np.array(feats)
+            feats_pad = feats[0][np.newaxis] if batch_size == 1 else np.stack(feats)
+        # update self.in_cache
+        for buffer in self.input_cache:
+            buffer.consume(frame_num * self.frame_shift_sample_length)
         self.fbanks = feats_pad
         self.fbanks_lens = copy.deepcopy(feats_lens)
         return waveforms, feats_pad, feats_lens
@@ -265,6 +436,7 @@ class WavFrontendOnline(WavFrontend):
     def lfr_cmvn(
         self, input: np.ndarray, input_lengths: np.ndarray, is_final: bool = False
     ) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+        """LFR + CMVN per utterance; the caller drops ``lfr_splice_frame_idxs`` frames from its splice cache."""
         batch_size = input.shape[0]
         feats = []
         feats_lens = []
@@ -272,20 +444,21 @@ class WavFrontendOnline(WavFrontend):
         for i in range(batch_size):
             mat = input[i, : input_lengths[i], :]
             lfr_splice_frame_idx = -1
-            if self.lfr_m != 1 or self.lfr_n != 1:
-                # update self.lfr_splice_cache in self.apply_lfr
-                mat, self.lfr_splice_cache[i], lfr_splice_frame_idx = self.apply_lfr(
-                    mat, self.lfr_m, self.lfr_n, is_final
-                )
+            stacked = self.lfr_m != 1 or self.lfr_n != 1
+            if stacked:
+                mat, _, lfr_splice_frame_idx = self.apply_lfr(mat, self.lfr_m, self.lfr_n, is_final)
             if self.cmvn_file is not None:
-                mat = self.apply_cmvn(mat)
+                mat = self.apply_cmvn(mat, inplace=stacked)
+            elif not stacked:
+                # do not hand out a view of the splice cache
+                mat = mat.copy()
             feat_length = mat.shape[0]
             feats.append(mat)
             feats_lens.append(feat_length)
             lfr_splice_frame_idxs.append(lfr_splice_frame_idx)
 
         feats_lens = np.array(feats_lens)
-        feats_pad = np.array(feats)
+        feats_pad = feats[0][np.newaxis] if batch_size == 1 else np.array(feats)
         return feats_pad, feats_lens, lfr_splice_frame_idxs
 
     def extract_fbank(
@@ -296,63 +469,63 @@ class WavFrontendOnline(WavFrontend):
             batch_size == 1
         ), "we support to extract feature online only when the batch size is equal to 1 now"
         waveforms, feats, feats_lengths = self.fbank(input, input_lengths)  # input shape: B T D
+        splice_cache = self.lfr_splice_cache
         if feats.shape[0]:
-            self.waveforms = (
-                waveforms
-                if self.reserve_waveforms is None
-                else np.concatenate((self.reserve_waveforms, waveforms), axis=1)
-            )
-            if not self.lfr_splice_cache:
-                for i in range(batch_size):
-                    self.lfr_splice_cache.append(
-                        np.expand_dims(feats[i][0, :], axis=0).repeat((self.lfr_m - 1) // 2, axis=0)
-                    )
-
-            if feats_lengths[0] + self.lfr_splice_cache[0].shape[0] >= self.lfr_m:
-                lfr_splice_cache_np = np.stack(self.lfr_splice_cache)  # B T D
-                feats = np.concatenate((lfr_splice_cache_np, feats), axis=1)
-                feats_lengths += lfr_splice_cache_np[0].shape[0]
+            first_chunk = self.reserve_waveforms is None
+            # waveform_buffer holds the reserved samples, the new ones are appended after them
+            self.waveform_buffer.append(waveforms[0])
+            self.waveforms = self.waveform_buffer.view()[np.newaxis]
+            if not self.splice_ready:
+                splice_cache.append(np.broadcast_to(feats[0][0], ((self.lfr_m - 1) // 2, feats.shape[2])))
+                self.splice_ready = True
+
+            if feats_lengths[0] + len(splice_cache) >= self.lfr_m:
+                splice_cache.append(feats[0])
+                feats_lengths = np.array([len(splice_cache)])
                 frame_from_waveforms = int(
                     (self.waveforms.shape[1] - self.frame_sample_length)
                     / self.frame_shift_sample_length
                     + 1
                 )
-                minus_frame = (self.lfr_m - 1) // 2 if self.reserve_waveforms is None else 0
+                minus_frame = (self.lfr_m - 1) // 2 if first_chunk else 0
                 feats, feats_lengths, lfr_splice_frame_idxs = self.lfr_cmvn(
-                    feats, feats_lengths, is_final
+                    splice_cache.view()[np.newaxis], feats_lengths, is_final
                 )
+                if lfr_splice_frame_idxs[0] >= 0:
+                    splice_cache.consume(lfr_splice_frame_idxs[0])
+                else:
+                    splice_cache.clear()
                 if self.lfr_m == 1:
+                    self.waveform_buffer.clear()
                     self.reserve_waveforms = None
                 else:
                     reserve_frame_idx = lfr_splice_frame_idxs[0] - minus_frame
-                    # print('reserve_frame_idx:  ' + str(reserve_frame_idx))
-                    # print('frame_frame:  ' + str(frame_from_waveforms))
-                    self.reserve_waveforms = self.waveforms[
-                        :,
-                        reserve_frame_idx
-                        * self.frame_shift_sample_length : frame_from_waveforms
-                        * self.frame_shift_sample_length,
-                    ]
                     sample_length = (
                         frame_from_waveforms - 1
                     ) * self.frame_shift_sample_length + self.frame_sample_length
                     self.waveforms = self.waveforms[:, :sample_length]
+                    # only indices move, so self.waveforms stays valid until the next chunk
+                    self.waveform_buffer.consume(reserve_frame_idx * self.frame_shift_sample_length)
+                    self.waveform_buffer.truncate(
+                        (frame_from_waveforms - reserve_frame_idx) * self.frame_shift_sample_length
+                    )
+                    self.reserve_waveforms = self.waveform_buffer
             else:
                 # update self.reserve_waveforms and self.lfr_splice_cache
-                self.reserve_waveforms = self.waveforms[
-                    :, : -(self.frame_sample_length - self.frame_shift_sample_length)
-                ]
-                for i in range(batch_size):
-                    self.lfr_splice_cache[i] = np.concatenate(
-                        (self.lfr_splice_cache[i], feats[i]), axis=0
-                    )
+                self.waveform_buffer.truncate(
+                    len(self.waveform_buffer) - (self.frame_sample_length - self.frame_shift_sample_length)
+                )
+                self.reserve_waveforms = self.waveform_buffer
+                splice_cache.append(feats[0])
                 return np.empty(0, dtype=np.float32), feats_lengths
         else:
             if is_final:
                 self.waveforms = (
-                    waveforms if self.reserve_waveforms is None else self.reserve_waveforms
+                    waveforms
+                    if self.reserve_waveforms is None
+                    else self.waveform_buffer.view()[np.newaxis]
                 )
-                feats = np.stack(self.lfr_splice_cache)
+                feats = splice_cache.view()[np.newaxis]
                 feats_lengths = np.zeros(batch_size, dtype=np.int32) + feats.shape[1]
                 feats, feats_lengths, _ = self.lfr_cmvn(feats, feats_lengths, is_final)
         if is_final:
@@ -363,25 +536,184 @@ class WavFrontendOnline(WavFrontend):
         return self.waveforms
 
     def cache_reset(self):
-        self.fbank_fn = knf.OnlineFbank(self.opts)
         self.reserve_waveforms = None
         self.input_cache = None
-        self.lfr_splice_cache = []
+        self.waveform_buffer.clear()
+        self.lfr_splice_cache.clear()
+        self.splice_ready = False
+
+
+class WavFrontendMultiStream(WavFrontend):
+    """Online frontend for many live streams stepped together.
+
+    Per-stream state lives in preallocated slots: the samples that do not
+    fill a frame yet (< ``frame_length``) and the LFR splice cache
+    (< ``lfr_m`` frames). ``extract_fbank`` takes one chunk for each of
+    several streams, runs a single fbank over all their frames and returns
+    ragged LFR+CMVN features. Streams are added and removed through a free
+    list; the slot arrays only grow (doubling) when every slot is taken.
+    """
+
+    def __init__(self, max_streams: int = 16, **kwargs):
+        super().__init__(**kwargs)
+        self.frame_sample_length = self.fbank_computer.frame_length
+        self.frame_shift_sample_length = self.fbank_computer.frame_shift
+        n_mels = self.fbank_computer.n_mels
+        self.rng = np.random.default_rng()
+        self.capacity = 0
+        self.input_cache = np.empty((0, self.frame_sample_length), dtype=np.float32)
+        self.input_cache_len = np.empty(0, dtype=np.int64)
+        self.splice_cache = np.empty((0, max(self.lfr_m, 1), n_mels), dtype=np.float32)
+        self.splice_cache_len = np.empty(0, dtype=np.int64)
+        self.splice_ready = np.empty(0, dtype=bool)
+        self.active = np.empty(0, dtype=bool)
+        self.free_slots = []
+        self._grow(max(1, max_streams))
+
+    def _grow(self, capacity: int):
+        old = self.capacity
+
+        def grown(array):
+            new = np.zeros((capacity,) + array.shape[1:], dtype=array.dtype)
+            new[:old] = array
+            return new
+
+        self.input_cache = grown(self.input_cache)
+        self.input_cache_len = grown(self.input_cache_len)
+        self.splice_cache = grown(self.splice_cache)
+        self.splice_cache_len = grown(self.splice_cache_len)
+        self.splice_ready = grown(self.splice_ready)
+        self.active = grown(self.active)
+        # pop() hands out the lowest free slot first
+        self.free_slots.extend(range(capacity - 1, old - 1, -1))
+        self.capacity = capacity
+
+    @property
+    def num_streams(self) -> int:
+        return int(self.active.sum())
+
+    def add_stream(self) -> int:
+        if not self.free_slots:
+            self._grow(self.capacity * 2)
+        slot = self.free_slots.pop()
+        self.reset_stream(slot)
+        self.active[slot] = True
+        return slot
+
+    def remove_stream(self, slot: int):
+        if not self.active[slot]:
+            raise KeyError(f"unknown stream: {slot}")
+        self.active[slot] = False
+        self.reset_stream(slot)
+        self.free_slots.append(slot)
+
+    def reset_stream(self, slot: int):
+        self.input_cache_len[slot] = 0
+        self.splice_cache_len[slot] = 0
+        self.splice_ready[slot] = False
+
+    def extract_fbank(
+        self,
+        streams: List[int],
+        chunks: List[np.ndarray],
+        is_final: Union[bool, List[bool]] = False,
+    ) -> Tuple[List[np.ndarray], np.ndarray]:
+        """Feed one chunk (float32 in [-1, 1]) per stream; returns per-stream features and lengths.
+
+        A final chunk flushes the stream's splice cache with edge padding and
+        resets the slot, the stream itself stays registered.
+        """
+        if isinstance(is_final, bool):
+            is_final = [is_final] * len(streams)
+        shift = self.frame_shift_sample_length
+        frame_counts = []
+        frame_views = []
+        for slot, chunk in zip(streams, chunks):
+            if not self.active[slot]:
+                raise KeyError(f"unknown stream: {slot}")
+            chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+            cached = self.input_cache_len[slot]
+            waveform = (
+                np.concatenate((self.input_cache[slot, :cached], chunk)) if cached else chunk
+            )
+            frames = self.fbank_computer.num_frames(waveform.shape[0])
+            rest = waveform[frames * shift :]
+            self.input_cache[slot, : rest.shape[0]] = rest
+            self.input_cache_len[slot] = rest.shape[0]
+            frame_counts.append(frames)
+            if frames:
+                frame_views.append(self.fbank_computer.frames(waveform))
+
+        if frame_views:
+            fbanks = self.fbank_computer.compute_frames(
+                np.concatenate(frame_views), scale=1 << 15, rng=self.rng
+            )
+        else:
+            fbanks = np.empty((0, self.fbank_computer.n_mels), dtype=np.float32)
+
+        feats = []
+        offset = 0
+        for slot, frames, final in zip(streams, frame_counts, is_final):
+            feats.append(self._lfr_cmvn_step(slot, fbanks[offset : offset + frames], final))
+            offset += frames
+        feats_lens = np.array([feat.shape[0] for feat in feats], dtype=np.int32)
+        return feats, feats_lens
+
+    def _lfr_cmvn_step(self, slot: int, fbank: np.ndarray, is_final: bool) -> np.ndarray:
+        lfr_m, lfr_n = self.lfr_m, self.lfr_n
+        if lfr_m == 1 and lfr_n == 1:
+            feat = fbank.copy()
+            if self.cmvn_file is not None:
+                feat = self.apply_cmvn(feat, inplace=True)
+            if is_final:
+                self.reset_stream(slot)
+            return feat
+
+        cache = self.splice_cache[slot]
+        cached = self.splice_cache_len[slot]
+        if fbank.shape[0] and not self.splice_ready[slot]:
+            # left context of the first LFR window is the first frame repeated
+            cached = (lfr_m - 1) // 2
+            cache[:cached] = fbank[0]
+            self.splice_ready[slot] = True
+        total = cached + fbank.shape[0]
+        feat = np.empty((0, lfr_m * fbank.shape[1]), dtype=np.float32)
+        if total and (total >= lfr_m or is_final):
+            inputs = np.concatenate((cache[:cached], fbank))
+            feat, rest, _ = WavFrontendOnline.apply_lfr(inputs, lfr_m, lfr_n, is_final)
+            if self.cmvn_file is not None:
+                feat = self.apply_cmvn(feat, inplace=True)
+            cache[: rest.shape[0]] = rest
+            self.splice_cache_len[slot] = rest.shape[0]
+        else:
+            cache[cached:total] = fbank
+            self.splice_cache_len[slot] = total
+        if is_final:
+            self.reset_stream(slot)
+        return feat
+
+
+def pcm16_view(data) -> np.ndarray:
+    """Zero-copy int16 view of raw 16-bit PCM.
+
+    Accepts bytes, bytearray, memoryview, mmap or an int16 ndarray (e.g. the
+    recorder's buffer, a socket payload or ``f.read()`` of a headerless file).
+    The result shares memory with ``data`` and is read-only for immutable
+    buffers.
+    """
+    if isinstance(data, np.ndarray):
+        if data.dtype != np.int16:
+            raise TypeError(f"expected int16 pcm, got {data.dtype}")
+        return data.reshape(-1)
+    if memoryview(data).nbytes % 2:
+        raise ValueError("16-bit pcm must have an even number of bytes")
+    return np.frombuffer(data, dtype=np.int16)
 
 
 def load_bytes(input):
-    middle_data = np.frombuffer(input, dtype=np.int16)
-    middle_data = np.asarray(middle_data)
-    if middle_data.dtype.kind not in "iu":
-        raise TypeError("'middle_data' must be an array of integers")
-    dtype = np.dtype("float32")
-    if dtype.kind != "f":
-        raise TypeError("'dtype' must be a floating point type")
-
-    i = np.iinfo(middle_data.dtype)
-    abs_max = 2 ** (i.bits - 1)
-    offset = i.min + abs_max
-    array = np.frombuffer((middle_data.astype(dtype) - offset) / abs_max, dtype=np.float32)
+    # one int16 -> float32 conversion, scaled in place
+    array = pcm16_view(input).astype(np.float32)
+    array *= np.float32(1.0 / (1 << 15))
     return array
 
 
@@ -398,10 +730,23 @@ class SinusoidalPositionEncoderOnline:
         encoding = np.concatenate((np.sin(scaled_time), np.cos(scaled_time)), axis=2)
         return encoding.astype(dtype)
 
+    # (depth, dtype) -> read-only table of positions 1..N, grown geometrically
+    _tables = {}
+
+    def table(self, length: int, depth: int, dtype: np.dtype = np.float32) -> np.ndarray:
+        key = (depth, np.dtype(dtype))
+        table = self._tables.get(key)
+        if table is None or table.shape[1] < length:
+            capacity = max(length, 2 * table.shape[1] if table is not None else 512)
+            table = self.encode(np.arange(1, capacity + 1)[None, :], depth, dtype)
+            table.flags.writeable = False
+            self._tables[key] = table
+        return table
+
     def forward(self, x, start_idx=0):
+        # a chunk only slices the cached table, so its cost does not grow with the stream position
         batch_size, timesteps, input_dim = x.shape
-        positions = np.arange(1, timesteps + 1 + start_idx)[None, :]
-        position_encoding = self.encode(positions, input_dim, x.dtype)
+        position_encoding = self.table(start_idx + timesteps, input_dim, x.dtype)
 
         return x + position_encoding[:, start_idx : start_idx + timesteps]
 
@@ -0,0 +1,43 @@
+# -*- encoding: utf-8 -*-
+import importlib
+import threading
+import time
+
+_modules = {}
+_import_seconds = {}
+_lock = threading.Lock()
+
+
+def lazy_import(name: str, attr: str = None):
+    """Import ``name`` on first use and remember how long it took.
+
+    Heavy dependencies (torch, funasr, sounddevice, ...) are only imported
+    when a node actually runs, so loading the plugin stays cheap and machines
+    without e.g. PortAudio only fail when recording is used.
+    """
+    module = _modules.get(name)
+    if module is None:
+        with _lock:
+            module = _modules.get(name)
+            if module is None:
+                time_start = time.perf_counter()
+                module = importlib.import_module(name)
+                _import_seconds[name] = time.perf_counter() - time_start
+                _modules[name] = module
+    return getattr(module, attr) if attr else module
+
+
+def import_report() -> dict:
+    """Seconds spent importing each dependency, in import order.
+
+    A dependency imported inside another one (e.g. torch pulled in by funasr)
+    is counted in the outer import, so import the big ones first.
+    """
+    return dict(_import_seconds)
+
+
+def format_import_report() -> str:
+    report = import_report()
+    lines = [f"  {name:<20s}{seconds * 1000:8.1f} ms" for name, seconds in report.items()]
+    lines.append(f"  {'total':<20s}{sum(report.values()) * 1000:8.1f} ms")
+    return "\n".join(lines)
@@ -4,8 +4,10 @@
 #  MIT License  (https://opensource.org/licenses/MIT)
 
 import os.path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Union, Tuple
+from typing import Iterator, List, Union, Tuple
 import torch
 import librosa
 import numpy as np
@@ -41,8 +43,16 @@ class SenseVoiceSmallONNX:
         quantize: bool = False,
         intra_op_num_threads: int = 4,
         cache_dir: str = None,
+        pipeline_workers: int = 0,
+        pipeline_depth: int = 0,
         **kwargs,
     ):
+        """
+        pipeline_workers: threads that load audio and extract features for the next
+            batches while ONNX Runtime runs the current one; 0 runs everything on the
+            calling thread, -1 uses the cores not taken by ``intra_op_num_threads``.
+        pipeline_depth: max batches prepared ahead (default ``pipeline_workers + 1``).
+        """
         if quantize:
             model_file = os.path.join(model_dir, "model_quant.onnx")
         else:
@@ -64,6 +74,11 @@ class SenseVoiceSmallONNX:
         )
         self.batch_size = batch_size
         self.blank_id = 0
+        if pipeline_workers < 0:
+            pipeline_workers = max(1, (os.cpu_count() or 1) - intra_op_num_threads)
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_depth = pipeline_depth or pipeline_workers + 1
+        self._executor = None
 
     def __call__(self, 
                  wav_content: Union[str, np.ndarray, List[str]], 
@@ -71,33 +86,92 @@ class SenseVoiceSmallONNX:
                  textnorm: List,
                  tokenizer=None,
                  **kwargs) -> List:
-        waveform_list = self.load_data(wav_content, self.frontend.opts.frame_opts.samp_freq)
-        waveform_nums = len(waveform_list)
+        if isinstance(wav_content, (str, np.ndarray)):
+            wav_content = [wav_content]
+        if not isinstance(wav_content, list):
+            raise TypeError(f"The type of {wav_content} is not in [str, np.ndarray, list]")
+        batches = [
+            wav_content[beg_idx : beg_idx + self.batch_size]
+            for beg_idx in range(0, len(wav_content), self.batch_size)
+        ]
+        if self.pipeline_workers > 0 and len(batches) > 1:
+            batch_feats = self.pipelined_feats(batches)
+        else:
+            batch_feats = (self.prepare_batch(batch) for batch in batches)
+
         asr_res = []
-        for beg_idx in range(0, waveform_nums, self.batch_size):
-            end_idx = min(waveform_nums, beg_idx + self.batch_size)
-            feats, feats_len = self.extract_feat(waveform_list[beg_idx:end_idx])
+        beg_idx = 0
+        for feats, feats_len in batch_feats:
+            rows = feats.shape[0]
             ctc_logits, encoder_out_lens = self.infer(feats, 
                                  feats_len, 
-                                 np.array(language, dtype=np.int32), 
-                                 np.array(textnorm, dtype=np.int32)
+                                 self.prompt_ids(language, beg_idx, rows, len(wav_content)), 
+                                 self.prompt_ids(textnorm, beg_idx, rows, len(wav_content))
                                  )
+            beg_idx += rows
             # back to torch.Tensor
             ctc_logits = torch.from_numpy(ctc_logits).float()
-            # support batch_size=1 only currently
-            x = ctc_logits[0, : encoder_out_lens[0].item(), :]
-            yseq = x.argmax(dim=-1)
-            yseq = torch.unique_consecutive(yseq, dim=-1)
-
-            mask = yseq != self.blank_id
-            token_int = yseq[mask].tolist()
-            
-            if tokenizer is not None:
-                asr_res.append(tokenizer.tokens2text(token_int))
-            else:
-                asr_res.append(token_int)
+            for i in range(ctc_logits.shape[0]):
+                x = ctc_logits[i, : encoder_out_lens[i].item(), :]
+                yseq = x.argmax(dim=-1)
+                yseq = torch.unique_consecutive(yseq, dim=-1)
+
+                mask = yseq != self.blank_id
+                token_int = yseq[mask].tolist()
+
+                if tokenizer is not None:
+                    asr_res.append(tokenizer.tokens2text(token_int))
+                else:
+                    asr_res.append(token_int)
         return asr_res
 
+    @staticmethod
+    def prompt_ids(values, beg_idx: int, rows: int, total: int) -> np.ndarray:
+        """One language/textnorm id per row of the batch starting at input ``beg_idx``.
+
+        ``values`` holds either one id per input (sliced to the batch) or ids
+        shared by all inputs (a scalar or a single id, repeated for every row).
+        """
+        values = np.asarray(values, dtype=np.int32).reshape(-1)
+        if values.size == total:
+            values = values[beg_idx : beg_idx + rows]
+        return np.resize(values, rows)
+
+    def prepare_batch(self, batch: List[Union[str, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Load (decode/resample) and extract features for one batch; safe to run on a worker thread."""
+        waveform_list = []
+        for item in batch:
+            waveform_list.extend(self.load_data(item, self.frontend.opts.frame_opts.samp_freq))
+        return self.extract_feat(waveform_list)
+
+    def pipelined_feats(self, batches: List[List]) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """Yield batch features in order while the next ``pipeline_depth`` batches are prepared in the pool."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.pipeline_workers, thread_name_prefix="sensevoice-onnx-feat"
+            )
+        pending = deque()
+        batch_iter = iter(batches)
+        try:
+            for batch in batch_iter:
+                pending.append(self._executor.submit(self.prepare_batch, batch))
+                if len(pending) >= self.pipeline_depth:
+                    break
+            while pending:
+                result = pending.popleft().result()
+                batch = next(batch_iter, None)
+                if batch is not None:
+                    pending.append(self._executor.submit(self.prepare_batch, batch))
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
     def load_data(self, wav_content: Union[str, np.ndarray, List[str]], fs: int = None) -> List:
         def load_wav(path: str) -> np.ndarray:
             waveform, _ = librosa.load(path, sr=fs)
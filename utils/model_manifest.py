@@ -0,0 +1,188 @@
+# -*- encoding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+
+MANIFEST_NAME = ".sensevoice_manifest.json"
+REQUIRED_FILES = ("model.pt", "config.yaml")
+
+_resolved = {}
+_revisions = {}
+_resolve_lock = threading.Lock()
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _model_files(model_dir: str):
+    for root, dirs, files in os.walk(model_dir):
+        # modelscope keeps its own bookkeeping in hidden files/dirs
+        dirs[:] = [d for d in dirs if not d.startswith(".")]
+        for name in files:
+            if name.startswith("."):
+                continue
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, model_dir).replace(os.sep, "/"), path
+
+
+def write_manifest(model_dir: str, model_id: str = None) -> dict:
+    """Record size, mtime and sha256 of every model file next to the weights."""
+    files = {}
+    for rel, path in _model_files(model_dir):
+        st = os.stat(path)
+        files[rel] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_sha256(path)}
+    manifest = {"model_id": model_id, "files": files}
+    manifest["revision"] = manifest_revision(manifest)
+    tmp_path = os.path.join(model_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, os.path.join(model_dir, MANIFEST_NAME))
+    _revisions[model_dir] = manifest["revision"]
+    return manifest
+
+
+def read_manifest(model_dir: str):
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def manifest_revision(manifest: dict) -> str:
+    """Short digest over the file checksums; changes whenever any weight file changes."""
+    sha = hashlib.sha256()
+    for rel in sorted(manifest["files"]):
+        sha.update(rel.encode("utf-8"))
+        sha.update(manifest["files"][rel]["sha256"].encode("ascii"))
+    return sha.hexdigest()[:16]
+
+
+def model_revision(model_dir: str) -> str:
+    revision = _revisions.get(model_dir)
+    if revision is None:
+        manifest = read_manifest(model_dir)
+        if manifest is None:
+            return "unknown"
+        revision = _revisions[model_dir] = manifest.get("revision") or manifest_revision(manifest)
+    return revision
+
+
+def verify_manifest(model_dir: str, full: bool = False) -> bool:
+    """Check the model files against the manifest.
+
+    The fast check only stats each file; a file is re-hashed when its mtime
+    moved (or always, with ``full=True``).
+    """
+    manifest = read_manifest(model_dir)
+    if manifest is None or not manifest.get("files"):
+        return False
+    dirty = False
+    for rel, info in manifest["files"].items():
+        path = os.path.join(model_dir, rel)
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        if st.st_size != info["size"]:
+            return False
+        if full or st.st_mtime_ns != info["mtime_ns"]:
+            if file_sha256(path) != info["sha256"]:
+                return False
+            if st.st_mtime_ns != info["mtime_ns"]:
+                info["mtime_ns"] = st.st_mtime_ns
+                dirty = True
+    if dirty:
+        # content is unchanged, only remember the new mtime for the next fast check
+        with open(os.path.join(model_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return True
+
+
+def modelscope_cache_dirs(model_id: str) -> list:
+    """Directories where ``modelscope.snapshot_download`` may have put ``model_id``.
+
+    Covers the layouts of the modelscope versions in use, under
+    ``$MODELSCOPE_CACHE`` or ``~/.cache/modelscope``: ``hub/models/<owner>/<name>``,
+    ``models/<owner>/<name>``, the older ``hub/<owner>/<name>`` and
+    ``<owner>/<name>``, and ``models/<owner>--<name>/snapshots/<rev>``
+    (newest snapshot first). Dots in the name are stored as ``___``.
+    """
+    base = os.path.expanduser(os.environ.get("MODELSCOPE_CACHE") or os.path.join("~", ".cache", "modelscope"))
+    owner, _, name = model_id.partition("/")
+    names = [name.replace(".", "___")]
+    if "." in name:
+        names.append(name)
+    dirs = []
+    for prefix in (("hub", "models"), ("models",), ("hub",), ()):
+        for n in names:
+            dirs.append(os.path.join(base, *prefix, owner, n))
+    snapshots = os.path.join(base, "models", f"{owner}--{name}", "snapshots")
+    if os.path.isdir(snapshots):
+        revs = [os.path.join(snapshots, rev) for rev in os.listdir(snapshots)]
+        dirs.extend(sorted(revs, key=os.path.getmtime, reverse=True))
+    return dirs
+
+
+def resolve_model_dir(model_id: str, local_dir: str = None, offline: bool = False, downloader=None) -> str:
+    """Return a local directory holding ``model_id`` with as little I/O as possible.
+
+    Resolution order: in-process memo (no I/O) -> manifest check (stat only)
+    of ``local_dir``, or of the modelscope cache when ``local_dir`` is None ->
+    ``downloader`` (e.g. ``modelscope.snapshot_download``) unless ``offline``.
+    """
+    memo_key = (model_id, local_dir)
+    path = _resolved.get(memo_key)
+    if path is not None:
+        return path
+
+    with _resolve_lock:
+        path = _resolved.get(memo_key)
+        if path is not None:
+            return path
+
+        candidates = [local_dir] if local_dir is not None else modelscope_cache_dirs(model_id)
+        for candidate in candidates:
+            if not os.path.isdir(candidate):
+                continue
+            if verify_manifest(candidate):
+                _resolved[memo_key] = candidate
+                return candidate
+            if read_manifest(candidate) is None and offline and all(
+                os.path.isfile(os.path.join(candidate, name)) for name in REQUIRED_FILES
+            ):
+                # weights placed by hand (e.g. downloaded from huggingface)
+                write_manifest(candidate, model_id)
+                _resolved[memo_key] = candidate
+                return candidate
+
+        if offline:
+            where = local_dir if local_dir is not None else "the modelscope cache (" + ", ".join(candidates) + ")"
+            raise FileNotFoundError(
+                f"offline mode: {model_id} is missing or corrupt in {where}, "
+                f"run once with network access or copy the model files there"
+            )
+        if downloader is None:
+            raise ValueError("downloader is required when the model is not available locally")
+
+        if local_dir is None:
+            path = downloader(model_id=model_id)
+        else:
+            path = downloader(model_id=model_id, local_dir=local_dir) or local_dir
+        write_manifest(path, model_id)
+        _resolved[memo_key] = path
+        return path
+
+
+def forget_resolved():
+    with _resolve_lock:
+        _resolved.clear()
@@ -0,0 +1,197 @@
+# -*- encoding: utf-8 -*-
+import gc
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+
+class ModelRegistry:
+    """Process-wide LRU cache of loaded models.
+
+    Every node instance (and every workflow) asks the registry for a model by
+    key, so one copy of the weights is shared per (model_dir, device, vad
+    config, dtype). The least recently used model is dropped when more than
+    ``max_models`` are resident, or when the models on one device hold more
+    than ``max_bytes`` of weights (``model_nbytes``; CPU RAM and each GPU
+    are separate budgets, 0 disables it). The model just loaded is never
+    evicted, even if it alone is over the budget.
+
+    funasr's ``AutoModel.generate`` merges its call kwargs into the shared
+    ``self.kwargs``, so concurrent calls on one model leak options into each
+    other; ``lock_for(key)`` gives the lock to hold around every call.
+    """
+
+    def __init__(self, max_models: int = 2, max_bytes: int = 0):
+        self.max_models = max(1, int(max_models))
+        self.max_bytes = max(0, int(max_bytes))
+        self._models = OrderedDict()
+        self._nbytes = {}
+        self._lock = threading.RLock()
+        self._loading = {}
+        self._run_locks = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(model_dir, device, vad_kwargs=None, dtype="fp32"):
+        vad_items = tuple(sorted((vad_kwargs or {}).items()))
+        return (str(model_dir), str(device), vad_items, str(dtype))
+
+    def lock_for(self, key) -> threading.Lock:
+        """Lock that serializes inference on the model for ``key``."""
+        with self._lock:
+            return self._run_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, loader):
+        """Return the model for ``key``, calling ``loader()`` on a miss."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key]
+            # one lock per key so concurrent misses on the same key load once
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key]
+                self.misses += 1
+
+            print(f"加载模型: {key}")
+            model = loader()
+            nbytes = model_nbytes(model)
+
+            with self._lock:
+                self._models[key] = model
+                self._nbytes[key] = nbytes
+                self._loading.pop(key, None)
+                self._evict(key)
+            return model
+
+    def device_bytes(self, device) -> int:
+        """Weight bytes of the resident models on ``device``."""
+        with self._lock:
+            return sum(n for key, n in self._nbytes.items() if key[1] == str(device))
+
+    def _evict(self, newest):
+        evicted = False
+        while len(self._models) > self.max_models:
+            self._drop(next(iter(self._models)))
+            evicted = True
+        if self.max_bytes:
+            device = newest[1]
+            while self.device_bytes(device) > self.max_bytes:
+                key = next(k for k in self._models if k[1] == device)
+                if key == newest:
+                    break
+                self._drop(key)
+                evicted = True
+        if evicted:
+            release_memory()
+
+    def _drop(self, key):
+        self._models.pop(key)
+        self._nbytes.pop(key, None)
+        self._run_locks.pop(key, None)
+        self.evictions += 1
+        print(f"释放模型缓存: {key}")
+
+    def remove(self, key) -> bool:
+        with self._lock:
+            if self._models.pop(key, None) is None:
+                return False
+            self._nbytes.pop(key, None)
+            self._run_locks.pop(key, None)
+        release_memory()
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._nbytes.clear()
+            self._run_locks.clear()
+        release_memory()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+                "resident": len(self._models),
+                "max_models": self.max_models,
+                "resident_bytes": sum(self._nbytes.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+
+def model_nbytes(model) -> int:
+    """Bytes held by the tensors of ``model`` (an ``nn.Module`` or a funasr ``AutoModel``).
+
+    Counts parameters, buffers, packed weights of quantized modules (via
+    ``state_dict``) and the inner tensors of tensor subclasses, each storage
+    once. AutoModel is not a module itself, so
+    its module attributes (asr, vad, punc, ...) are summed.
+    """
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return 0
+    if isinstance(model, torch.nn.Module):
+        modules = [model]
+    else:
+        modules = [v for v in vars(model).values() if isinstance(v, torch.nn.Module)]
+    seen = set()
+    total = 0
+
+    def add(value):
+        nonlocal total
+        if isinstance(value, torch.Tensor) and hasattr(value, "__tensor_flatten__"):
+            # tensor subclasses (e.g. torchao int8 weights) report the float dtype, count their inner tensors
+            names, _ = value.__tensor_flatten__()
+            add([getattr(value, name) for name in names])
+        elif isinstance(value, torch.Tensor):
+            try:
+                storage = value.untyped_storage()
+                key, size = storage.data_ptr(), storage.nbytes()
+            except (RuntimeError, NotImplementedError, TypeError):
+                # quantized and wrapper tensors without a plain storage
+                key, size = id(value), value.numel() * value.element_size()
+            if key not in seen:
+                seen.add(key)
+                total += size
+        elif isinstance(value, (tuple, list)):
+            for item in value:
+                add(item)
+
+    for module in modules:
+        for value in module.state_dict(keep_vars=True).values():
+            add(value)
+    return total
+
+
+def release_memory():
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+model_registry = ModelRegistry(
+    max_models=int(os.environ.get("SENSEVOICE_MAX_MODELS", 2)),
+    max_bytes=int(float(os.environ.get("SENSEVOICE_MAX_MODEL_MB", 0)) * 2**20),
+)
@@ -0,0 +1,75 @@
+# -*- encoding: utf-8 -*-
+
+# Linear layers of SenseVoiceSmall that get int8 weights: attention in/out
+# projections, the feed-forward blocks and the CTC output layer. The FSMN
+# convolutions, layer norms and the prompt embedding stay fp32.
+QUANTIZED_LINEARS = ("linear_q_k_v", "linear_out", "feed_forward.w_1", "feed_forward.w_2", "ctc.ctc_lo")
+
+
+def quantizable_linears(model) -> list:
+    """Names of the ``nn.Linear`` modules in ``model`` covered by ``QUANTIZED_LINEARS``."""
+    import torch
+
+    names = []
+    for name, module in model.named_modules():
+        if not isinstance(module, torch.nn.Linear):
+            continue
+        if any(name == suffix or name.endswith("." + suffix) for suffix in QUANTIZED_LINEARS):
+            names.append(name)
+    return names
+
+
+def _torchao_int8():
+    """``(quantize_, config)`` for torchao's int8 dynamic quantization, or None without torchao."""
+    try:
+        from torchao.quantization import quantize_
+    except ImportError:
+        return None
+    try:
+        from torchao.quantization import Int8DynamicActivationInt8WeightConfig
+
+        config = Int8DynamicActivationInt8WeightConfig()
+    except ImportError:
+        # torchao < 0.10 names the config with a factory function
+        from torchao.quantization import int8_dynamic_activation_int8_weight
+
+        config = int8_dynamic_activation_int8_weight()
+    return quantize_, config
+
+
+def quantize_dynamic_int8(model):
+    """Dynamic int8 quantization of the SenseVoiceSmall linear layers, in place, for CPU inference.
+
+    Weights are quantized once, activations per batch at run time, so no
+    calibration data is needed. Works on this repo's ``model.SenseVoiceSmall``
+    and on funasr's, both use the same module names. Returns ``model``.
+
+    Uses torchao's ``quantize_`` when torchao is installed. Otherwise it
+    falls back to ``torch.ao.quantization.quantize_dynamic``, which is
+    deprecated and warns so, and raises ``RuntimeError`` on torch builds
+    that no longer ship it.
+    """
+    import torch
+
+    names = set(quantizable_linears(model))
+    if not names:
+        raise ValueError("no SenseVoiceSmall linear layers found to quantize")
+    model.eval()
+
+    torchao = _torchao_int8()
+    if torchao is not None:
+        quantize_, config = torchao
+        quantize_(model, config, filter_fn=lambda module, fqn: fqn in names)
+        return model
+
+    quantization = getattr(getattr(torch, "ao", None), "quantization", None)
+    quantize_dynamic = getattr(quantization, "quantize_dynamic", None)
+    if quantize_dynamic is None:
+        raise RuntimeError(
+            f"torch {torch.__version__} has no torch.ao.quantization.quantize_dynamic, "
+            "install torchao (pip install torchao) for int8 quantization"
+        )
+    if torch.backends.quantized.engine == "none":
+        torch.backends.quantized.engine = torch.backends.quantized.supported_engines[-1]
+    quantize_dynamic(model, names, dtype=torch.qint8, inplace=True)
+    return model
@@ -0,0 +1,171 @@
+# -*- encoding: utf-8 -*-
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+def audio_digest(item, memo: dict = None) -> str:
+    """sha256 of the audio content: file bytes for a path, samples for an array.
+
+    File digests are memoised in ``memo`` by (path, size, mtime).
+    """
+    if isinstance(item, str):
+        st = os.stat(item)
+        memo_key = (os.path.abspath(item), st.st_size, st.st_mtime_ns)
+        digest = memo.get(memo_key) if memo is not None else None
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(item, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    sha.update(chunk)
+            digest = sha.hexdigest()
+            if memo is not None:
+                if len(memo) > 4096:
+                    memo.clear()
+                memo[memo_key] = digest
+        return digest
+    waveform = np.ascontiguousarray(item, dtype=np.float32)
+    return hashlib.sha256(memoryview(waveform).cast("B")).hexdigest()
+
+
+class TranscriptionCache:
+    """Two-tier (memory + disk) LRU cache of transcripts keyed by audio content and decode params.
+
+    The disk tier stores one small json file per entry under ``cache_dir`` and
+    is bounded by ``max_disk_bytes``; the least recently used files are
+    removed first (file mtime is bumped on every disk hit).
+    """
+
+    def __init__(self, cache_dir: str = None, max_memory_items: int = 512, max_disk_bytes: int = 64 << 20):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._disk = None
+        self._disk_bytes = 0
+        self._digests = {}
+        self._lock = threading.RLock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # keys ---------------------------------------------------------------
+    def audio_digest(self, item) -> str:
+        """sha256 of the audio content: file bytes for a path, samples for an array."""
+        return audio_digest(item, self._digests)
+
+    @staticmethod
+    def make_key(audio_digest: str, **params) -> str:
+        payload = json.dumps({"audio": audio_digest, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # lookup -------------------------------------------------------------
+    def get(self, key: str):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            value = self._disk_get(key)
+            if value is not None:
+                self.disk_hits += 1
+                self._memory_put(key, value)
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._memory_put(key, value)
+            self._disk_put(key, value)
+
+    def _memory_put(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    # disk tier ----------------------------------------------------------
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + ".json")
+
+    def _load_disk_index(self):
+        if self._disk is not None:
+            return
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith(".json"):
+                        st = os.stat(os.path.join(root, name))
+                        entries.append((st.st_mtime_ns, name[:-5], st.st_size))
+        entries.sort()
+        self._disk = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(self._disk.values())
+
+    def _disk_get(self, key):
+        if not self.cache_dir:
+            return None
+        self._load_disk_index()
+        if key not in self._disk:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)["value"]
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            self._disk_bytes -= self._disk.pop(key)
+            return None
+        self._disk.move_to_end(key)
+        return value
+
+    def _disk_put(self, key, value):
+        if not self.cache_dir:
+            return
+        self._load_disk_index()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps({"value": value}, ensure_ascii=False).encode("utf-8")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._disk_bytes += len(data) - self._disk.pop(key, 0)
+        self._disk[key] = len(data)
+        while self._disk_bytes > self.max_disk_bytes and len(self._disk) > 1:
+            old_key, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir:
+                self._load_disk_index()
+                for key in list(self._disk):
+                    try:
+                        os.remove(self._path(key))
+                    except OSError:
+                        pass
+                self._disk.clear()
+                self._disk_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_bytes": self._disk_bytes,
+            }
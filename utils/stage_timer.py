@@ -0,0 +1,109 @@
+# -*- encoding: utf-8 -*-
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+
+class StageTimer:
+    """Wall-clock time per pipeline stage for one inference call.
+
+    ``mark(name)`` charges the time since the previous mark to ``name``;
+    repeated marks of the same stage (e.g. per utterance in a batch) add up.
+    With ``sync`` set (a callable such as ``torch.cuda.synchronize``) pending
+    device work is waited for first, so GPU stages are not under-reported.
+    """
+
+    def __init__(self, sync=None):
+        self.sync = sync
+        self.times = OrderedDict()
+        self._last = time.perf_counter()
+
+    def mark(self, name: str) -> float:
+        if self.sync is not None:
+            self.sync()
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self.times[name] = self.times.get(name, 0.0) + elapsed
+        self._last = now
+        return elapsed
+
+    def skip(self):
+        """Restart the clock without charging the elapsed time to any stage."""
+        if self.sync is not None:
+            self.sync()
+        self._last = time.perf_counter()
+
+    @property
+    def total(self) -> float:
+        return sum(self.times.values())
+
+
+class LatencyStats:
+    """Rolling per-stage latency histograms (p50/p95/p99) and audio throughput."""
+
+    def __init__(self, name: str, window: int = 512, log_path: str = None):
+        self.name = name
+        self.window = window
+        self.log_path = log_path
+        self._stages = OrderedDict()
+        self._calls = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, times: dict, audio_seconds: float = 0.0, **extra):
+        with self._lock:
+            for name, seconds in times.items():
+                if name not in self._stages:
+                    self._stages[name] = deque(maxlen=self.window)
+                self._stages[name].append(seconds)
+            self._calls.append((sum(times.values()), audio_seconds))
+        if self.log_path:
+            record = {
+                "scope": self.name,
+                "time": time.time(),
+                "audio_seconds": audio_seconds,
+                "stages": dict(times),
+            }
+            record.update(extra)
+            with self._lock, open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def summary(self) -> dict:
+        with self._lock:
+            stages = {name: np.asarray(values) for name, values in self._stages.items()}
+            calls = list(self._calls)
+        result = OrderedDict()
+        for name, values in stages.items():
+            if not len(values):
+                continue
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            result[name] = {
+                "count": len(values),
+                "mean_ms": float(values.mean() * 1000),
+                "p50_ms": float(p50 * 1000),
+                "p95_ms": float(p95 * 1000),
+                "p99_ms": float(p99 * 1000),
+            }
+        busy = sum(c[0] for c in calls)
+        audio = sum(c[1] for c in calls)
+        return {
+            "stages": result,
+            "audio_seconds_per_second": audio / busy if busy > 0 else 0.0,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._calls.clear()
+
+
+_window = int(os.environ.get("SENSEVOICE_TIMING_WINDOW", 512))
+_log_path = os.environ.get("SENSEVOICE_TIMING_LOG") or None
+
+# model-internal stages (SenseVoiceSmall.inference) and node-level stages are kept apart
+# so that audio throughput is not counted twice
+stage_stats = LatencyStats("model", window=_window, log_path=_log_path)
+node_stats = LatencyStats("node", window=_window, log_path=_log_path)
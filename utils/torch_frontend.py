@@ -0,0 +1,163 @@
+# -*- encoding: utf-8 -*-
+"""Batched fbank + LFR + CMVN in torch, on the same device as the encoder.
+
+Mirrors ``utils.frontend.WavFrontend`` (and funasr's ``WavFrontend``): the
+window and mel banks come from ``utils.fbank`` so both paths share one
+definition, framing is ``Tensor.unfold`` and LFR is a single ``gather``.
+
+Features are not bit-exact with the numpy path, since float32 FFT and mel
+sums round differently. The max abs diff is about 1.25e-3 on a ragged
+batch of 0.1-rms noise (``benchmarks/bench_torch_frontend.py``).
+"""
+from typing import List, Tuple, Union
+
+import numpy as np
+import torch
+from torch import nn
+
+from .fbank import FLOAT_EPSILON, FbankComputer
+
+
+def pad_waveforms(
+    data: Union[np.ndarray, torch.Tensor, List], device=None
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Stack one or more 1-d waveforms into a zero padded ``(batch, samples)`` tensor."""
+    if isinstance(data, (np.ndarray, torch.Tensor)):
+        data = torch.as_tensor(data)
+        if data.dim() < 2:
+            data = data[None, :]
+        elif data.shape[0] > 1:
+            data = data.float().mean(dim=0, keepdim=True)
+        data = [data[0]]
+    data = [torch.as_tensor(x) for x in data]
+    lengths = torch.tensor([x.shape[0] for x in data], dtype=torch.int64, device=device)
+    max_length = int(lengths.max()) if len(data) else 0
+    dtype = data[0].dtype if data else torch.float32
+    waveforms = torch.zeros((len(data), max_length), dtype=dtype, device=device)
+    for i, x in enumerate(data):
+        waveforms[i, : x.shape[0]] = x.to(device, non_blocking=True)
+    return waveforms, lengths
+
+
+class TorchWavFrontend(nn.Module):
+    """fbank + LFR + CMVN for a padded batch, returns ``(batch, frames, n_mels * lfr_m)``."""
+
+    def __init__(
+        self,
+        cmvn=None,
+        fs: int = 16000,
+        window: str = "hamming",
+        n_mels: int = 80,
+        frame_length: int = 25,
+        frame_shift: int = 10,
+        lfr_m: int = 1,
+        lfr_n: int = 1,
+        dither: float = 0.0,
+        preemph_coeff: float = 0.97,
+        upsacle_samples: bool = True,
+        block_frames: int = 4096,
+    ):
+        super().__init__()
+        computer = FbankComputer(
+            fs=fs, n_mels=n_mels, frame_length=frame_length, frame_shift=frame_shift, window=window
+        )
+        self.fs = fs
+        self.n_mels = n_mels
+        self.lfr_m = lfr_m
+        self.lfr_n = lfr_n
+        self.dither = dither
+        self.preemph_coeff = preemph_coeff
+        self.upsacle_samples = upsacle_samples
+        self.block_frames = block_frames
+        self.frame_length_samples = computer.frame_length
+        self.frame_shift_samples = computer.frame_shift
+        self.padded_length = computer.padded_length
+        self.register_buffer("window", torch.from_numpy(computer.window), persistent=False)
+        self.register_buffer("mel_banks", torch.from_numpy(computer.mel_banks), persistent=False)
+        if cmvn is not None:
+            cmvn = torch.from_numpy(np.array(cmvn, dtype=np.float32))
+            self.register_buffer("cmvn", cmvn, persistent=False)
+        else:
+            self.cmvn = None
+
+    @classmethod
+    def from_frontend(cls, frontend, **kwargs) -> "TorchWavFrontend":
+        """Build from ``utils.frontend.WavFrontend`` or funasr's ``WavFrontend``."""
+        from .frontend import frontend_conf
+
+        conf = frontend_conf(frontend)
+        conf.pop("cmvn_file")
+        conf.update(kwargs)
+        return cls(**conf)
+
+    def num_frames(self, lengths: torch.Tensor) -> torch.Tensor:
+        frames = (
+            torch.div(lengths - self.frame_length_samples, self.frame_shift_samples, rounding_mode="floor")
+            + 1
+        )
+        return torch.where(lengths >= self.frame_length_samples, frames, torch.zeros_like(frames))
+
+    def fbank(self, waveforms: torch.Tensor, lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        lengths = torch.as_tensor(lengths, device=waveforms.device)
+        feat_lengths = self.num_frames(lengths)
+        batch_size = waveforms.shape[0]
+        max_frames = int(feat_lengths.max()) if batch_size else 0
+        feats = torch.zeros(
+            (batch_size, max_frames, self.n_mels), dtype=torch.float32, device=waveforms.device
+        )
+        if max_frames == 0:
+            return feats, feat_lengths
+        # int16 pcm is already on the kaldi scale
+        scale = 1.0 if waveforms.dtype == torch.int16 or not self.upsacle_samples else float(1 << 15)
+        num_samples = (max_frames - 1) * self.frame_shift_samples + self.frame_length_samples
+        frames = waveforms[:, :num_samples].unfold(1, self.frame_length_samples, self.frame_shift_samples)
+        c = self.preemph_coeff
+        for beg in range(0, max_frames, self.block_frames):
+            x = frames[:, beg : beg + self.block_frames].to(torch.float32) * scale
+            if self.dither != 0.0:
+                x = x + self.dither * torch.randn_like(x)
+            x = x - x.mean(dim=-1, keepdim=True)
+            if c != 0.0:
+                x = torch.cat((x[..., :1] * (1.0 - c), x[..., 1:] - c * x[..., :-1]), dim=-1)
+            x = x * self.window
+            spectrum = torch.fft.rfft(x, n=self.padded_length)
+            power = spectrum.real.square() + spectrum.imag.square()
+            mel = torch.matmul(power, self.mel_banks).clamp_min(FLOAT_EPSILON)
+            feats[:, beg : beg + self.block_frames] = mel.log()
+        return self._mask(feats, feat_lengths), feat_lengths
+
+    def lfr(self, feats: torch.Tensor, feat_lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Stack ``lfr_m`` frames every ``lfr_n`` frames, padding with each utterance's first/last frame."""
+        if self.lfr_m == 1 and self.lfr_n == 1:
+            return feats, feat_lengths
+        batch_size, _, dim = feats.shape
+        lfr_lengths = torch.div(feat_lengths + self.lfr_n - 1, self.lfr_n, rounding_mode="floor")
+        max_lfr = int(lfr_lengths.max()) if batch_size else 0
+        index = (
+            torch.arange(max_lfr, device=feats.device)[:, None] * self.lfr_n
+            + torch.arange(self.lfr_m, device=feats.device)[None, :]
+            - (self.lfr_m - 1) // 2
+        ).clamp_min(0)
+        last = (feat_lengths - 1).clamp_min(0)
+        index = torch.minimum(index[None], last[:, None, None])
+        stacked = torch.gather(feats, 1, index.reshape(batch_size, -1, 1).expand(-1, -1, dim))
+        stacked = stacked.reshape(batch_size, max_lfr, self.lfr_m * dim)
+        return self._mask(stacked, lfr_lengths), lfr_lengths
+
+    def apply_cmvn(self, feats: torch.Tensor, feat_lengths: torch.Tensor) -> torch.Tensor:
+        if self.cmvn is None:
+            return feats
+        dim = feats.shape[-1]
+        feats = (feats + self.cmvn[0, :dim]) * self.cmvn[1, :dim]
+        return self._mask(feats, feat_lengths)
+
+    @staticmethod
+    def _mask(feats: torch.Tensor, lengths: torch.Tensor) -> torch.Tensor:
+        valid = torch.arange(feats.shape[1], device=feats.device)[None, :] < lengths[:, None]
+        return feats.masked_fill(~valid[..., None], 0.0)
+
+    def forward(self, waveforms: torch.Tensor, lengths: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        feats, feat_lengths = self.fbank(waveforms, lengths)
+        feats, feat_lengths = self.lfr(feats, feat_lengths)
+        feats = self.apply_cmvn(feats, feat_lengths)
+        return feats, feat_lengths.to(torch.int32)
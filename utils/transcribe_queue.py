@@ -0,0 +1,115 @@
+# -*- encoding: utf-8 -*-
+import itertools
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+
+class TranscriptionQueue:
+    """Bounded background worker pool for transcription jobs.
+
+    ``submit`` puts a job on a bounded queue and returns a job id right away;
+    callers then ``poll``, ``result`` (wait) or ``cancel`` it. Only a job that
+    has not started yet can be cancelled; a running job keeps going and its
+    result stays collectable. Finished jobs can be collected any number of
+    times until they are evicted (the oldest beyond ``max_finished``).
+    Workers are started lazily on the first submit.
+    """
+
+    def __init__(self, num_workers: int = 1, max_pending: int = 16, max_finished: int = 256):
+        self.num_workers = max(1, int(num_workers))
+        self.max_finished = max_finished
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._jobs = {}
+        self._finished = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def _start_workers(self):
+        with self._lock:
+            if self._workers:
+                return
+            for i in range(self.num_workers):
+                worker = threading.Thread(target=self._worker, name=f"sensevoice-stt-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _worker(self):
+        while True:
+            future, fn, args, kwargs = self._queue.get()
+            try:
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    future.set_result(fn(*args, **kwargs))
+                except BaseException as e:
+                    future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, fn, *args, block: bool = True, timeout: float = None, **kwargs) -> str:
+        """Queue ``fn(*args, **kwargs)``; raises ``queue.Full`` when the queue stays full."""
+        self._start_workers()
+        future = Future()
+        job_id = f"stt-{next(self._ids)}"
+        self._queue.put((future, fn, args, kwargs), block=block, timeout=timeout)
+        with self._lock:
+            self._jobs[job_id] = future
+        future.add_done_callback(lambda _: self._on_done(job_id))
+        return job_id
+
+    def _on_done(self, job_id):
+        # keep finished jobs collectable, but forget the oldest ones nobody picked up
+        with self._lock:
+            self._finished.append(job_id)
+            while len(self._finished) > self.max_finished:
+                self._jobs.pop(self._finished.pop(0), None)
+
+    def future(self, job_id: str) -> Future:
+        with self._lock:
+            future = self._jobs.get(job_id)
+        if future is None:
+            raise KeyError(
+                f"unknown or expired job: {job_id} (only the last {self.max_finished} finished jobs are kept)"
+            )
+        return future
+
+    def poll(self, job_id: str) -> str:
+        future = self.future(job_id)
+        if future.cancelled():
+            return "cancelled"
+        if future.done():
+            return "error" if future.exception() is not None else "done"
+        return "running" if future.running() else "pending"
+
+    def result(self, job_id: str, timeout: float = None):
+        """Wait for the job and return its result; it stays collectable until evicted."""
+        return self.future(job_id).result(timeout=timeout)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started; returns False for running or finished jobs."""
+        return self.future(job_id).cancel()
+
+    def forget(self, job_id: str):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+            if job_id in self._finished:
+                self._finished.remove(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            futures = list(self._jobs.values())
+        return {
+            "queued": self._queue.qsize(),
+            "running": sum(1 for f in futures if f.running()),
+            "finished": sum(1 for f in futures if f.done()),
+            "workers": len(self._workers),
+        }
+
+
+transcribe_queue = TranscriptionQueue(
+    num_workers=int(os.environ.get("SENSEVOICE_QUEUE_WORKERS", 1)),
+    max_pending=int(os.environ.get("SENSEVOICE_QUEUE_SIZE", 16)),
+)